@@ -0,0 +1,374 @@
+#####################################################################################
+#Prebuilt field index: compact binary file, memory-mapped for instant-start queries#
+#####################################################################################
+
+import argparse
+import datetime
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import defaultdict, deque
+
+# --- File Format ---
+# Little-endian. A fixed header, a section directory of (offset, count) pairs, then the sections,
+# each 8-byte aligned. Every string (field names, tool IDs, plugins, usage details, ...) lives once
+# in the string table and is referenced by its 32-bit id everywhere else.
+#
+#   string_offsets     u64 x (strings + 1)   byte offsets into string_blob
+#   string_blob        utf-8 bytes
+#   fields             4 x u64 per field     folded_name_sid, name_sid, postings_start, postings_count
+#                                            sorted by (case-folded name, name) for binary search
+#   postings           5 x u32 per usage     workflow, node, context_sid, detail_sid, (criticality << 1) | is_downstream_sot
+#   workflows          5 x u64 per workflow  name_sid, last_modified_sid, node_start, node_count, is_acyclic
+#   nodes              3 x u32 per tool      tool_id_sid, plugin_sid, calgary_root_sid (NO_STRING if none)
+#   edge_offsets       u64 x (nodes + 1)     CSR adjacency over global node numbers
+#   edge_targets       u32 x edges
+#   topo_order         u32 x nodes           per workflow, its node numbers in topological order (identity if cyclic)
+#   node_field_offsets u64 x (nodes + 1)     CSR of the fields each tool uses
+#   node_field_ids     u32 x pairs
+#   calgary_nodes      2 x u32 per entry     calgary_root_sid, node; sorted by string id
+INDEX_MAGIC = b'AXFIDX01'
+INDEX_VERSION = 2 # 2: topological order per workflow
+NO_STRING = 0xFFFFFFFF
+SECTION_NAMES = ('string_offsets', 'string_blob', 'fields', 'postings', 'workflows', 'nodes', 'edge_offsets',
+                 'edge_targets', 'topo_order', 'node_field_offsets', 'node_field_ids', 'calgary_nodes')
+HEADER = struct.Struct('<8sIII') # magic, version, sot_key_sid, created_sid
+SECTION_ENTRY = struct.Struct('<QQ') # offset, count
+FIELD_ENTRY = struct.Struct('<QQQQ')
+POSTING_ENTRY = struct.Struct('<IIIII')
+WORKFLOW_ENTRY = struct.Struct('<QQQQQ')
+NODE_ENTRY = struct.Struct('<III')
+CALGARY_ENTRY = struct.Struct('<II')
+U32 = struct.Struct('<I')
+U64 = struct.Struct('<Q')
+
+
+def _section_bytes(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class FieldIndexBuilder(object):
+    """
+    Collects scan results (the dicts returned by main.scan_workflow) and writes them as an index file.
+    Each workflow's nodes, edges and topological order are copied from its scan['tool_graph'].
+    """
+    def __init__(self, sot_filename_key=None):
+        self.sot_filename_key = sot_filename_key
+        self._string_ids = {}
+        self._strings = []
+        self._field_ids = {}
+        self._field_postings = [] # per field: flat array of 5 u32 per posting
+        self._workflows = array('Q')
+        self._nodes = array('I')
+        self._edge_offsets = array('Q', [0])
+        self._edge_targets = array('I')
+        self._topo_order = array('I')
+        self._node_field_offsets = array('Q', [0])
+        self._node_field_ids = array('I')
+        self._calgary_nodes = []
+
+    def _sid(self, text):
+        if text is None: return NO_STRING
+        text = str(text)
+        sid = self._string_ids.get(text)
+        if sid is None:
+            sid = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+        return sid
+
+    def _field_id(self, field_name):
+        field_id = self._field_ids.get(field_name)
+        if field_id is None:
+            self._sid(field_name)
+            field_id = self._field_ids[field_name] = len(self._field_postings)
+            self._field_postings.append(array('I'))
+        return field_id
+
+    def add_workflow(self, scan):
+        workflow_number = len(self._workflows) // 5
+        node_start = len(self._nodes) // 3
+        tool_graph = scan['tool_graph']
+        node_numbers = {tool_id: node_start + i for i, tool_id in enumerate(tool_graph.tool_ids)}
+        self._workflows.extend((self._sid(scan['FileName']), self._sid(scan['LastModified']), node_start,
+                                len(tool_graph.tool_ids), 1 if tool_graph.topo_order is not None else 0))
+
+        node_fields = defaultdict(set)
+        for usage in scan['usages']:
+            node_number = node_numbers.get(usage['ToolID'])
+            if node_number is None: continue
+            field_id = self._field_id(usage['FieldName'])
+            node_fields[node_number].add(field_id)
+            flags = (int(usage['UsageCriticallity']) << 1) | (1 if int(usage['IsDownstreamSOT']) == 1 else 0)
+            self._field_postings[field_id].extend((workflow_number, node_number, self._sid(usage['UsageContext']),
+                                                   self._sid(usage['FieldUsage']), flags))
+        edge_start = len(self._edge_targets)
+        self._edge_targets.extend(node_start + target for target in tool_graph.edge_targets)
+        for i, tool_id in enumerate(tool_graph.tool_ids):
+            node_number = node_start + i
+            calgary_root = tool_graph.calgary_roots.get(i)
+            self._nodes.extend((self._sid(tool_id), self._sid(tool_graph.plugins[i]), self._sid(calgary_root)))
+            if calgary_root is not None: self._calgary_nodes.append((self._sid(calgary_root), node_number))
+            self._edge_offsets.append(edge_start + tool_graph.edge_offsets[i + 1])
+            self._node_field_ids.extend(sorted(node_fields.get(node_number, ())))
+            self._node_field_offsets.append(len(self._node_field_ids))
+        topo_order = tool_graph.topo_order if tool_graph.topo_order is not None else range(len(tool_graph.tool_ids))
+        self._topo_order.extend(node_start + i for i in topo_order)
+
+    def write(self, index_path):
+        sot_key_sid = self._sid(self.sot_filename_key)
+        created_sid = self._sid(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        field_names = sorted(self._field_ids, key=lambda name: (name.casefold(), name))
+        for name in field_names: self._sid(name.casefold())
+        field_position = {self._field_ids[name]: position for position, name in enumerate(field_names)}
+
+        encoded = [s.encode('utf-8') for s in self._strings]
+        string_offsets = array('Q', [0])
+        total = 0
+        for data in encoded:
+            total += len(data)
+            string_offsets.append(total)
+
+        fields = array('Q')
+        postings = array('I')
+        for name in field_names:
+            field_postings = self._field_postings[self._field_ids[name]]
+            fields.extend((self._string_ids[name.casefold()], self._string_ids[name], len(postings) // 5, len(field_postings) // 5))
+            postings.extend(field_postings)
+        node_field_ids = array('I', (field_position[field_id] for field_id in self._node_field_ids))
+        calgary_nodes = array('I')
+        for root_sid, node_number in sorted(self._calgary_nodes):
+            calgary_nodes.extend((root_sid, node_number))
+
+        sections = [
+            (_section_bytes(string_offsets), len(string_offsets)),
+            (b''.join(encoded), total),
+            (_section_bytes(fields), len(field_names)),
+            (_section_bytes(postings), len(postings) // 5),
+            (_section_bytes(self._workflows), len(self._workflows) // 5),
+            (_section_bytes(self._nodes), len(self._nodes) // 3),
+            (_section_bytes(self._edge_offsets), len(self._edge_offsets)),
+            (_section_bytes(self._edge_targets), len(self._edge_targets)),
+            (_section_bytes(self._topo_order), len(self._topo_order)),
+            (_section_bytes(self._node_field_offsets), len(self._node_field_offsets)),
+            (_section_bytes(node_field_ids), len(node_field_ids)),
+            (_section_bytes(calgary_nodes), len(calgary_nodes) // 2)
+        ]
+        offset = HEADER.size + SECTION_ENTRY.size * len(SECTION_NAMES)
+        directory = []
+        for data, count in sections:
+            offset += -offset % 8
+            directory.append((offset, count))
+            offset += len(data)
+
+        temp_path = index_path + '.tmp'
+        with open(temp_path, 'wb') as f_index:
+            f_index.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, sot_key_sid, created_sid))
+            for section_offset, count in directory:
+                f_index.write(SECTION_ENTRY.pack(section_offset, count))
+            for (data, _), (section_offset, _) in zip(sections, directory):
+                f_index.write(b'\0' * (section_offset - f_index.tell()))
+                f_index.write(data)
+        os.replace(temp_path, index_path)
+        return {'fields': len(field_names), 'postings': len(postings) // 5, 'workflows': len(self._workflows) // 5,
+                'tools': len(self._nodes) // 3, 'strings': len(self._strings), 'bytes': offset}
+
+
+class FieldIndexReader(object):
+    """
+    Memory-maps an index file and answers lookups by reading only the pages they touch.
+    """
+    def __init__(self, index_path):
+        self._file = open(index_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, sot_key_sid, created_sid = HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"'{index_path}' is not a version {INDEX_VERSION} field index file")
+        self._sections = {}
+        for i, name in enumerate(SECTION_NAMES):
+            self._sections[name] = SECTION_ENTRY.unpack_from(self._mm, HEADER.size + i * SECTION_ENTRY.size)
+        self.sot_filename_key = self.string(sot_key_sid)
+        self.created = self.string(created_sid)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if getattr(self, '_mm', None) is not None: self._mm.close()
+        self._mm = None
+        self._file.close()
+
+    def _count(self, section):
+        return self._sections[section][1]
+
+    def _record(self, section, layout, number):
+        return layout.unpack_from(self._mm, self._sections[section][0] + number * layout.size)
+
+    def string(self, sid):
+        if sid == NO_STRING: return None
+        start, end = struct.unpack_from('<QQ', self._mm, self._sections['string_offsets'][0] + sid * 8)
+        blob_offset = self._sections['string_blob'][0]
+        return self._mm[blob_offset + start:blob_offset + end].decode('utf-8')
+
+    def info(self):
+        return {'workflows': self._count('workflows'), 'fields': self._count('fields'), 'usages': self._count('postings'),
+                'tools': self._count('nodes'), 'edges': self._count('edge_targets'),
+                'sot_filename_key': self.sot_filename_key, 'created': self.created}
+
+    def _matching_field_numbers(self, field_name):
+        # Binary search over the case-folded names, then take the run of spellings that share it.
+        folded = field_name.casefold()
+        low, high = 0, self._count('fields')
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(self._record('fields', FIELD_ENTRY, middle)[0]) < folded: low = middle + 1
+            else: high = middle
+        numbers = []
+        while low < self._count('fields') and self.string(self._record('fields', FIELD_ENTRY, low)[0]) == folded:
+            numbers.append(low)
+            low += 1
+        return numbers
+
+    def _workflow_of_node(self, node_number):
+        low, high = 0, self._count('workflows')
+        while low < high:
+            middle = (low + high) // 2
+            if self._record('workflows', WORKFLOW_ENTRY, middle)[2] <= node_number: low = middle + 1
+            else: high = middle
+        return low - 1
+
+    def _successors(self, node_number):
+        start, end = struct.unpack_from('<QQ', self._mm, self._sections['edge_offsets'][0] + node_number * 8)
+        targets_offset = self._sections['edge_targets'][0]
+        return struct.unpack_from(f'<{end - start}I', self._mm, targets_offset + start * 4)
+
+    def _node_fields(self, node_number):
+        start, end = struct.unpack_from('<QQ', self._mm, self._sections['node_field_offsets'][0] + node_number * 8)
+        return struct.unpack_from(f'<{end - start}I', self._mm, self._sections['node_field_ids'][0] + start * 4)
+
+    def _sot_nodes(self, sot_key):
+        # Distinct Calgary root strings are few; test each once and collect the tools that read it.
+        sot_nodes = set()
+        matched_sids = {}
+        for entry_number in range(self._count('calgary_nodes')):
+            root_sid, node_number = self._record('calgary_nodes', CALGARY_ENTRY, entry_number)
+            if root_sid not in matched_sids: matched_sids[root_sid] = sot_key in self.string(root_sid)
+            if matched_sids[root_sid]: sot_nodes.add(node_number)
+        return sot_nodes
+
+    def downstream_nodes(self, sot_key):
+        sot_nodes = self._sot_nodes(sot_key)
+        seeds_by_workflow = defaultdict(list)
+        for node_number in sot_nodes: seeds_by_workflow[self._workflow_of_node(node_number)].append(node_number)
+        reached = set(sot_nodes)
+        for workflow_number, seeds in seeds_by_workflow.items():
+            _, _, node_start, node_count, is_acyclic = self._record('workflows', WORKFLOW_ENTRY, workflow_number)
+            if is_acyclic:
+                # Predecessors come first in topological order, so one forward pass over the workflow suffices.
+                topo_order = struct.unpack_from(f'<{node_count}I', self._mm, self._sections['topo_order'][0] + node_start * 4)
+                for node_number in topo_order:
+                    if node_number in reached: reached.update(self._successors(node_number))
+                continue
+            queue = deque(seeds)
+            while queue:
+                for successor in self._successors(queue.popleft()):
+                    if successor not in reached:
+                        reached.add(successor)
+                        queue.append(successor)
+        return sot_nodes, reached
+
+    def _tool(self, node_number):
+        tool_id_sid, plugin_sid, _ = self._record('nodes', NODE_ENTRY, node_number)
+        return self.string(tool_id_sid), self.string(plugin_sid)
+
+    def field_usages(self, field_name, sot_key=None, sot_only=False, limit=None):
+        # IsDownstreamSOT is taken from the scan, or recomputed from the stored graphs when sot_key is given.
+        downstream = self.downstream_nodes(sot_key)[1] if sot_key else None
+        usages = []
+        for field_number in self._matching_field_numbers(field_name):
+            _, name_sid, postings_start, postings_count = self._record('fields', FIELD_ENTRY, field_number)
+            name = self.string(name_sid)
+            for posting_number in range(postings_start, postings_start + postings_count):
+                workflow_number, node_number, context_sid, detail_sid, flags = self._record('postings', POSTING_ENTRY, posting_number)
+                is_downstream = (1 if node_number in downstream else 0) if downstream is not None else flags & 1
+                if sot_only and not is_downstream: continue
+                workflow_name_sid, last_modified_sid, _, _, _ = self._record('workflows', WORKFLOW_ENTRY, workflow_number)
+                tool_id, plugin = self._tool(node_number)
+                usages.append({
+                    'FileName': self.string(workflow_name_sid),
+                    'LastModified': self.string(last_modified_sid),
+                    'ToolID': tool_id,
+                    'Tool': plugin,
+                    'FieldName': name,
+                    'UsageContext': self.string(context_sid),
+                    'FieldUsage': self.string(detail_sid),
+                    'IsDownstreamSOT': is_downstream,
+                    'UsageCriticallity': flags >> 1
+                })
+                if limit and len(usages) >= limit: return usages
+        return usages
+
+    def sot_impact(self, sot_key):
+        sot_nodes, reached = self.downstream_nodes(sot_key)
+        by_workflow = defaultdict(list)
+        for node_number in reached:
+            by_workflow[self._workflow_of_node(node_number)].append(node_number)
+        workflows = []
+        for workflow_number in sorted(by_workflow):
+            name_sid = self._record('workflows', WORKFLOW_ENTRY, workflow_number)[0]
+            node_numbers = sorted(by_workflow[workflow_number])
+            field_numbers = set()
+            for node_number in node_numbers: field_numbers.update(self._node_fields(node_number))
+            workflows.append({
+                'FileName': self.string(name_sid),
+                'SoTToolIDs': sorted(self._tool(n)[0] for n in node_numbers if n in sot_nodes),
+                'DownstreamToolIDs': [self._tool(n)[0] for n in node_numbers],
+                'DownstreamFields': sorted(self.string(self._record('fields', FIELD_ENTRY, f)[1]) for f in field_numbers)
+            })
+        return {'sot_key': sot_key, 'workflow_count': len(workflows), 'workflows': workflows}
+
+
+# --- Query CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a prebuilt Alteryx field index without rescanning workflows.")
+    parser.add_argument('index', help="Index file written by analyze_alteryx_ecosystem_merged(index_path=...)")
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument('--json', action='store_true', help="Print JSON instead of tab-separated rows")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('info', parents=[output_options], help="Show index size and the SoT key it was built with")
+    field_parser = subparsers.add_parser('field', parents=[output_options], help="List usages of a field (case-insensitive)")
+    field_parser.add_argument('field_name')
+    field_parser.add_argument('-s', '--sot_key', help="Recompute IsDownstreamSOT for this SoT key")
+    field_parser.add_argument('--sot_only', action='store_true', help="Only usages downstream of the SoT")
+    field_parser.add_argument('--limit', type=int, default=None)
+    sot_parser = subparsers.add_parser('sot-impact', parents=[output_options], help="Workflows, tools and fields downstream of an SoT key")
+    sot_parser.add_argument('sot_key')
+    args = parser.parse_args(argv)
+
+    with FieldIndexReader(args.index) as reader:
+        if args.command == 'info':
+            result = reader.info()
+            rows = [[key, value] for key, value in result.items()]
+        elif args.command == 'field':
+            result = reader.field_usages(args.field_name, args.sot_key, args.sot_only, args.limit)
+            rows = [[u['FileName'], u['ToolID'], u['Tool'], u['FieldName'], u['UsageContext'], u['IsDownstreamSOT'], u['UsageCriticallity']] for u in result]
+        else:
+            result = reader.sot_impact(args.sot_key)
+            rows = [[w['FileName'], ','.join(w['DownstreamToolIDs']), ','.join(w['DownstreamFields'])] for w in result['workflows']]
+        if args.json: print(json.dumps(result, indent=2))
+        else:
+            for row in rows: print('\t'.join('' if value is None else str(value) for value in row))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
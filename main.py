@@ -1,11 +1,37 @@
 import xml.etree.ElementTree as ET
 import csv
-from shutil import copyfile
 import sys
 import os
 import re
-from collections import deque, defaultdict
+from collections import deque, defaultdict, Counter
 import datetime # Added for LastModified date
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+import codecs
+import hashlib
+import json
+import heapq
+import itertools
+import functools
+import marshal
+import tempfile
+import shutil
+import socket
+from xml.sax.saxutils import escape as xml_escape
+from array import array
+from field_index import FieldIndexBuilder
+
+try:
+    import pandas as pd # Optional: only needed for the impact report
+except ImportError:
+    pd = None
+
+try:
+    from lxml import etree as lxml_etree # Optional: faster XML parsing backend
+except ImportError:
+    lxml_etree = None
 
 # --- Tool Criticality Mapping ---
 TOOL_CRITICALITY_MAPPING = {
@@ -23,22 +49,255 @@ TOOL_CRITICALITY_MAPPING = {
     "TableauOutput_1_4_0": 4
 }
 
+OUTPUT_B_HEADERS = ['FileName', 'LastModified', 'ToolID', 'Tool', 'FieldName',
+                    'UsageContext', 'FieldUsage', 'IsDownstreamSOT', 'UsageCriticallity']
+
+# --- XML Parser Backend ---
+# 'auto' uses lxml when it is installed and falls back to xml.etree.ElementTree otherwise.
+XML_BACKENDS = ('auto', 'lxml', 'stdlib')
+XML_PARSE_ERRORS = (ET.ParseError,) + ((lxml_etree.XMLSyntaxError,) if lxml_etree is not None else ())
+_active_xml_backend = None
+_lxml_parser = None
+
+def set_xml_backend(backend='auto'):
+    global _active_xml_backend, _lxml_parser
+    if backend not in XML_BACKENDS:
+        raise ValueError(f"Unknown XML backend '{backend}'. Expected one of: {', '.join(XML_BACKENDS)}")
+    if backend == 'lxml' and lxml_etree is None:
+        print("Warning: lxml is not installed; falling back to the standard library XML parser.", file=sys.stderr)
+        backend = 'stdlib'
+    if backend == 'auto':
+        backend = 'lxml' if lxml_etree is not None else 'stdlib'
+    if backend == 'lxml' and _lxml_parser is None:
+        # huge_tree lifts libxml2's depth and text-size limits, which large workflows with embedded
+        # macros or long SQL/formula text can exceed. Comments and PIs are dropped as ElementTree does.
+        _lxml_parser = lxml_etree.XMLParser(huge_tree=True, remove_comments=True, remove_pis=True)
+    _active_xml_backend = backend
+    return backend
+
+def get_xml_backend():
+    if _active_xml_backend is None: set_xml_backend('auto')
+    return _active_xml_backend
+
+def _restores_xml_backend(func):
+    # Entry points taking xml_backend select it for their own run only; the caller's backend
+    # (or the unresolved default) is put back when they return.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _active_xml_backend
+        previous_backend = _active_xml_backend
+        try: return func(*args, **kwargs)
+        finally: _active_xml_backend = previous_backend
+    return wrapper
+
+def _parse_xml_file(filepath):
+    if get_xml_backend() == 'lxml':
+        return lxml_etree.parse(filepath, _lxml_parser).getroot()
+    return ET.parse(filepath).getroot()
+
+def _parse_xml_string(xml_text):
+    if get_xml_backend() == 'lxml':
+        # lxml rejects str input carrying an encoding declaration, so hand it bytes.
+        return lxml_etree.fromstring(xml_text.encode('utf-8'), _lxml_parser)
+    return ET.fromstring(xml_text)
+
+def _find_workflow_nodes(root):
+    if get_xml_backend() == 'lxml':
+        return root.xpath('.//Node')
+    return root.findall('.//Node')
+
+def _find_connection_edges(root):
+    if get_xml_backend() == 'lxml':
+        # Pull both ToolID lists with XPath instead of touching every Connection element from Python.
+        # The predicate keeps the two lists aligned: each selected Connection contributes to both.
+        connection_path = './Connections[1]/Connection[Origin[1]/@ToolID and Destination[1]/@ToolID]'
+        origins = root.xpath(connection_path + '/Origin[1]/@ToolID')
+        destinations = root.xpath(connection_path + '/Destination[1]/@ToolID')
+        return [(str(o), str(d)) for o, d in zip(origins, destinations)]
+    edges = []
+    connections_xml = root.find('Connections')
+    if connections_xml is not None:
+        for conn_xml in connections_xml.findall('Connection'):
+            origin_node = conn_xml.find('Origin')
+            dest_node = conn_xml.find('Destination')
+            if origin_node is not None and 'ToolID' in origin_node.attrib and dest_node is not None and 'ToolID' in dest_node.attrib:
+                edges.append((origin_node.attrib['ToolID'], dest_node.attrib['ToolID']))
+    return edges
+
+# --- Target Field Matching ---
+TARGET_MATCH_MODES = ('exact', 'ignorecase', 'glob')
+GLOB_WILDCARD_CHARS = '*?['
+REGEX_TARGET_PREFIX = 're:' # In glob mode, target entries starting with this are regular expressions
+
+def _xml_escaped_variants(name):
+    # Field names are stored XML-escaped in the raw file, and escaped twice inside nested Calgary <Query> XML.
+    once = xml_escape(name, {'"': '&quot;', "'": '&apos;'})
+    twice = xml_escape(once, {'"': '&quot;', "'": '&apos;'})
+    return {name, once, twice}
+
+def _glob_literal_fragment(pattern):
+    # Longest wildcard-free run of a glob; every match of the glob contains it.
+    fragments = re.split(r'\*|\?|\[[^\]]*\]', pattern)
+    return max(fragments, key=len) if fragments else ''
+
+def _glob_to_regex(pattern):
+    regex_parts = []
+    for token in re.split(r'(\*|\?|\[[^\]]+\])', pattern):
+        if token == '*': regex_parts.append('.*')
+        elif token == '?': regex_parts.append('.')
+        elif len(token) > 2 and token.startswith('[') and token.endswith(']'):
+            body = token[1:-1]
+            if body.startswith('!'): body = '^' + body[1:]
+            regex_parts.append('[' + body.replace('\\', '\\\\') + ']')
+        elif token: regex_parts.append(re.escape(token))
+    return ''.join(regex_parts)
+
+def _trie_regex(words):
+    # Factor a set of literal strings into a prefix trie and render it as one regex, so thousands of
+    # names cost a walk down the trie instead of one alternative per name.
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    def render(node):
+        is_end = '' in node
+        branches = [re.escape(ch) + render(child) for ch, child in sorted((k, v) for k, v in node.items() if k)]
+        if not branches: return ''
+        if len(branches) == 1 and not is_end: return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if is_end else group
+    return render(trie)
+
+class TargetFieldMatcher(object):
+    def __init__(self, target_fields, mode='exact'):
+        if mode not in TARGET_MATCH_MODES:
+            raise ValueError(f"Unknown target match mode '{mode}'. Expected one of: {', '.join(TARGET_MATCH_MODES)}")
+        self.mode = mode
+        self.target_fields = set(target_fields)
+        self.case_sensitive = mode == 'exact'
+        self.files_prescanned = 0
+        self.files_skipped = 0
+        self._match_cache = {}
+        fold = (lambda s: s) if self.case_sensitive else str.casefold
+        flags = re.DOTALL | (0 if self.case_sensitive else re.IGNORECASE)
+
+        # Sort entries into the shapes the automaton handles cheaply. Literal names, prefix ('PII_*') and
+        # suffix ('*_SSN') globs share one trie-factored regex, so large governance lists keep a flat
+        # per-field cost. Every other glob and every 're:' entry is compiled on its own: combining
+        # arbitrary regexes would clash on group names, inline flags and backreference numbering.
+        literals, prefixes, suffixes = set(), set(), set()
+        general_patterns = [] # (compiled pattern, literal fragment every match contains, or '' if none)
+        prescan_fragments = set()
+        for target in self.target_fields:
+            if mode == 'glob' and target.startswith(REGEX_TARGET_PREFIX):
+                regex_body = target[len(REGEX_TARGET_PREFIX):]
+                try: general_patterns.append((re.compile(regex_body, flags), ''))
+                except re.error as e:
+                    print(f"Warning: Skipping invalid target regex '{regex_body}': {e}", file=sys.stderr)
+                    continue
+                prescan_fragments = None # No literal can be derived from an arbitrary regex
+            elif mode == 'glob' and any(c in target for c in GLOB_WILDCARD_CHARS):
+                fragment = _glob_literal_fragment(target)
+                if re.fullmatch(r'[^*?\[]+\*', target): prefixes.add(fold(target[:-1]))
+                elif re.fullmatch(r'\*[^*?\[]+', target): suffixes.add(fold(target[1:]))
+                else: general_patterns.append((re.compile(_glob_to_regex(fold(target)), flags), _glob_literal_fragment(fold(target))))
+                if not fragment: prescan_fragments = None # A pattern like '*' matches anything
+                elif prescan_fragments is not None: prescan_fragments.update(_xml_escaped_variants(fragment))
+            else:
+                literals.add(fold(target))
+                if prescan_fragments is not None: prescan_fragments.update(_xml_escaped_variants(target))
+
+        alternatives = []
+        if literals: alternatives.append(_trie_regex(literals))
+        if prefixes: alternatives.append('(?:' + _trie_regex(prefixes) + ').*')
+        if suffixes: alternatives.append('.*(?:' + _trie_regex(suffixes) + ')')
+        self._fold = fold
+        self._automaton = re.compile('(?:' + '|'.join(alternatives) + ')', flags) if alternatives else None
+
+        # General globs are only verified when their literal fragment occurs in the name. All fragments
+        # are found in one pass of a trie search; at each position the lookahead yields the longest
+        # fragment starting there, and every shorter fragment starting there is one of its prefixes.
+        self._patterns_by_fragment = defaultdict(list)
+        self._unanchored_patterns = []
+        for pattern, fragment in general_patterns:
+            if fragment: self._patterns_by_fragment[fragment].append(pattern)
+            else: self._unanchored_patterns.append(pattern)
+        self._fragment_lengths = sorted({len(fragment) for fragment in self._patterns_by_fragment})
+        self._fragment_scanner = re.compile('(?=(' + _trie_regex(self._patterns_by_fragment) + '))', flags) if self._patterns_by_fragment else None
+        self.pattern_counts = {'literal': len(literals), 'prefix': len(prefixes), 'suffix': len(suffixes), 'general': len(general_patterns)}
+
+        # The raw pre-scan reuses the same trie construction over every literal the targets must contain.
+        # Case-sensitive matching searches the undecoded UTF-8 bytes directly.
+        self._prescan_automaton = None
+        self._prescan_bytes_automaton = None
+        self._prescan_disabled = prescan_fragments is None
+        if prescan_fragments:
+            prescan_regex = _trie_regex({fold(f) for f in prescan_fragments})
+            self._prescan_automaton = re.compile(prescan_regex)
+            if self.case_sensitive: self._prescan_bytes_automaton = re.compile(prescan_regex.encode('utf-8'))
+
+    def __len__(self):
+        return len(self.target_fields)
+
+    def _matches_general(self, folded_name):
+        if self._fragment_scanner is not None:
+            checked = set()
+            for hit in self._fragment_scanner.finditer(folded_name):
+                longest = hit.group(1)
+                for length in self._fragment_lengths:
+                    if length > len(longest): break
+                    fragment = longest[:length]
+                    if fragment in checked: continue
+                    checked.add(fragment)
+                    for pattern in self._patterns_by_fragment.get(fragment, ()):
+                        if pattern.fullmatch(folded_name) is not None: return True
+        return any(pattern.fullmatch(folded_name) is not None for pattern in self._unanchored_patterns)
+
+    def matches(self, field_name):
+        cached = self._match_cache.get(field_name)
+        if cached is not None: return cached
+        folded_name = self._fold(field_name)
+        result = (self._automaton is not None and self._automaton.fullmatch(folded_name) is not None) or self._matches_general(folded_name)
+        self._match_cache[field_name] = result
+        return result
+
+    def could_match_raw(self, raw_bytes):
+        self.files_prescanned += 1
+        if self._prescan_disabled: return True
+        if self._prescan_automaton is not None:
+            if raw_bytes.startswith(codecs.BOM_UTF16_LE) or raw_bytes.startswith(codecs.BOM_UTF16_BE):
+                if self._prescan_automaton.search(self._fold(raw_bytes.decode('utf-16', errors='replace'))) is not None: return True
+            elif self._prescan_bytes_automaton is not None:
+                if self._prescan_bytes_automaton.search(raw_bytes) is not None: return True
+            elif self._prescan_automaton.search(self._fold(raw_bytes.decode('utf-8', errors='replace'))) is not None: return True
+        self.files_skipped += 1
+        return False
+
 class EnhancedNodeElement(object):
-    def __init__(self, node_xml):
-        self.tool_id = node_xml.attrib.get('ToolID', 'UnknownToolID')
+    def __init__(self, node_xml, target_matcher=None):
+        self.target_matcher = target_matcher # When set, only matching fields are materialized
+        self.tool_id = node_xml.get('ToolID', 'UnknownToolID')
         self.plugin = None
         self.node_xml = node_xml
 
         gui_settings_node = node_xml.find('GuiSettings')
         if gui_settings_node is not None:
-            self.plugin = gui_settings_node.attrib.get('Plugin')
+            self.plugin = gui_settings_node.get('Plugin')
 
         self.extracted_fields = []
         self.calgary_root_filename = None
+        # Schema facts for wildcard resolution, recorded regardless of target_matcher
+        self.output_field_names = []
+        self.select_fields = [] # (field, selected, rename) for every SelectField, including deselected ones
+        self.select_unknown_passthrough = False
+        self.template_field_names = []
         self._parse_configuration()
 
     def _add_field(self, name, context, detail, is_output=False):
-        if name:
+        if name and is_output and name not in WILDCARD_FIELD_PLACEHOLDERS: self.output_field_names.append(name)
+        if name and (self.target_matcher is None or self.target_matcher.matches(name)):
             self.extracted_fields.append({
                 "field_name": name,
                 "usage_context": context,
@@ -73,6 +332,8 @@ class EnhancedNodeElement(object):
                         field_name = field_node.get('field')
                         renamed_to = field_node.get('rename')
                         is_selected = field_node.get('selected') == 'True'
+                        if field_name == '*Unknown': self.select_unknown_passthrough = is_selected
+                        elif field_name: self.select_fields.append((field_name, is_selected, renamed_to))
                         if is_selected and field_name:
                             self._add_field(field_name, "select_input_field", f"Selected, renamed to: {renamed_to if renamed_to else 'N/A'}", is_output=False)
                             if renamed_to and renamed_to != field_name:
@@ -81,6 +342,7 @@ class EnhancedNodeElement(object):
                                 self._add_field(field_name, "select_output_passthrough_field", "Selected, not renamed", is_output=True)
                 dynamic_unknown_node = configuration_node.find('SelectConfiguration')
                 if dynamic_unknown_node is not None and dynamic_unknown_node.get('DeselectUnknown') == 'False':
+                       self.select_unknown_passthrough = True
                        self._add_field("*UnknownOrDynamicFields*", "select_dynamic_passthrough", "Dynamic/Unknown fields are passed through", is_output=True)
 
             # --- Join Tool ---
@@ -176,12 +438,12 @@ class EnhancedNodeElement(object):
                 query_node = configuration_node.find('Query')
                 if query_node is not None and query_node.text and query_node.text.strip():
                     try:
-                        inner_xml_root = ET.fromstring(query_node.text.strip())
+                        inner_xml_root = _parse_xml_string(query_node.text.strip())
                         for field_element in inner_xml_root.findall('.//Field'):
                             field_name = field_element.get('name')
                             self._add_field(field_name, "calgary_query_field", query_node.text.strip(), is_output=False)
                             self._add_field(field_name, "calgary_query_output_field", query_node.text.strip(), is_output=True)
-                    except ET.ParseError: pass
+                    except XML_PARSE_ERRORS: pass
                 if self.plugin == 'CalgaryPluginsGui.CalgaryJoin.CalgaryJoin':
                     join_fields_container = configuration_node.find('JoinFields')
                     if join_fields_container is not None:
@@ -229,90 +491,264 @@ class EnhancedNodeElement(object):
             elif self.plugin == 'AlteryxConnectorGui.DynamicInput.DynamicInput':
                 input_source_template_node = configuration_node.find('InputSourceTemplate')
                 if input_source_template_node is not None:
+                    # The template's own input configuration may list its fields, like an InputData tool does
+                    self.template_field_names = [f.get('name') for f in configuration_node.findall('.//FormatSpecificOptions/FieldNames/Field') if f.get('name')]
                     self._add_field("*FieldsFromDynamicInputTemplate*", "dynamicinput_template_field", "Fields defined by DynamicInput template", is_output=True)
         except Exception:
             pass
 
 # --- SoT and Workflow Processing ---
+CALGARY_SOURCE_PLUGINS = ('CalgaryPluginsGui.CalgaryInput.CalgaryInput', 'CalgaryPluginsGui.CalgaryJoin.CalgaryJoin')
+
+def _calgary_root_filenames(all_nodes_map):
+    return {tool_id: node_obj.calgary_root_filename for tool_id, node_obj in all_nodes_map.items()
+            if node_obj.plugin in CALGARY_SOURCE_PLUGINS and node_obj.calgary_root_filename}
+
+class WorkflowToolGraph(object):
+    # A workflow's tool graph with integer tool numbers: CSR adjacency (the successors of tool i are
+    # edge_targets[edge_offsets[i]:edge_offsets[i + 1]]), a topological order and the Calgary root
+    # filename of each Calgary source. Lineage for any SoT key is then one pass over the stored
+    # graph instead of a reparse of <Connections>.
+    def __init__(self, tool_ids, plugins, edge_offsets, edge_targets, topo_order, calgary_roots):
+        self.tool_ids = list(tool_ids)
+        self.plugins = list(plugins)
+        self.edge_offsets = array('I', edge_offsets)
+        self.edge_targets = array('I', edge_targets)
+        self.topo_order = array('I', topo_order) if topo_order is not None else None # None: the graph has a cycle
+        self.calgary_roots = dict(calgary_roots) # tool number -> Calgary root filename
+
+    @classmethod
+    def from_edges(cls, tool_plugins, tool_edges, calgary_roots=None):
+        tool_ids = list(tool_plugins)
+        plugins = [tool_plugins[tool_id] for tool_id in tool_ids]
+        tool_numbers = {tool_id: i for i, tool_id in enumerate(tool_ids)}
+        for edge in tool_edges:
+            for tool_id in edge:
+                if tool_id not in tool_numbers: # Connection to a node that failed to parse; lineage still flows through it
+                    tool_numbers[tool_id] = len(tool_ids)
+                    tool_ids.append(tool_id)
+                    plugins.append(None)
+        successors = [[] for _ in tool_ids]
+        for origin_tool_id, dest_tool_id in tool_edges:
+            successors[tool_numbers[origin_tool_id]].append(tool_numbers[dest_tool_id])
+        edge_offsets, edge_targets = array('I', [0]), array('I')
+        for targets in successors:
+            edge_targets.extend(targets)
+            edge_offsets.append(len(edge_targets))
+        roots = {tool_numbers[tool_id]: root_filename for tool_id, root_filename in (calgary_roots or {}).items() if tool_id in tool_numbers}
+        return cls(tool_ids, plugins, edge_offsets, edge_targets, _topological_order(edge_offsets, edge_targets), roots)
+
+    @classmethod
+    def from_workflow(cls, root_xml_element, all_nodes_map):
+        tool_plugins = {tool_id: node_obj.plugin for tool_id, node_obj in all_nodes_map.items()}
+        return cls.from_edges(tool_plugins, _find_connection_edges(root_xml_element), _calgary_root_filenames(all_nodes_map))
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['tools'], record['plugins'], record['edge_offsets'], record['edge_targets'], record['topo_order'],
+                   {tool_number: root_filename for tool_number, root_filename in record['calgary_roots']})
+
+    def to_record(self):
+        return {'tools': self.tool_ids, 'plugins': self.plugins, 'edge_offsets': self.edge_offsets.tolist(),
+                'edge_targets': self.edge_targets.tolist(),
+                'topo_order': self.topo_order.tolist() if self.topo_order is not None else None,
+                'calgary_roots': sorted(self.calgary_roots.items())}
+
+    def sot_tool_ids(self, sot_filename_key):
+        return {self.tool_ids[i] for i, root_filename in self.calgary_roots.items() if sot_filename_key in root_filename}
+
+    def downstream_tool_ids(self, sot_filename_key):
+        if not sot_filename_key: return set()
+        seeds = [i for i, root_filename in self.calgary_roots.items() if sot_filename_key in root_filename]
+        if not seeds: return set()
+        reached = bytearray(len(self.tool_ids))
+        for i in seeds: reached[i] = 1
+        offsets, targets = self.edge_offsets, self.edge_targets
+        if self.topo_order is not None:
+            # Every predecessor of a tool comes before it in topological order, so one forward pass suffices.
+            for i in self.topo_order:
+                if reached[i]:
+                    for j in range(offsets[i], offsets[i + 1]): reached[targets[j]] = 1
+        else:
+            queue = deque(seeds)
+            while queue:
+                i = queue.popleft()
+                for j in range(offsets[i], offsets[i + 1]):
+                    if not reached[targets[j]]:
+                        reached[targets[j]] = 1
+                        queue.append(targets[j])
+        return {self.tool_ids[i] for i, flag in enumerate(reached) if flag}
+
+def _topological_order(edge_offsets, edge_targets):
+    # Kahn's algorithm; returns None when the graph has a cycle.
+    tool_count = len(edge_offsets) - 1
+    in_degree = [0] * tool_count
+    for target in edge_targets: in_degree[target] += 1
+    queue = deque(i for i in range(tool_count) if not in_degree[i])
+    order = array('I')
+    while queue:
+        i = queue.popleft()
+        order.append(i)
+        for j in range(edge_offsets[i], edge_offsets[i + 1]):
+            in_degree[edge_targets[j]] -= 1
+            if not in_degree[edge_targets[j]]: queue.append(edge_targets[j])
+    return order if len(order) == tool_count else None
+
 def get_sot_downstream_tool_ids(root_xml_element, all_nodes_map, sot_filename_key):
-    sot_initial_tool_ids = set()
     if not sot_filename_key: return set() # Simplified return
-    for tool_id, node_obj in all_nodes_map.items():
-        if node_obj.plugin in ('CalgaryPluginsGui.CalgaryInput.CalgaryInput', 'CalgaryPluginsGui.CalgaryJoin.CalgaryJoin'):
-            if node_obj.calgary_root_filename and sot_filename_key in node_obj.calgary_root_filename:
-                sot_initial_tool_ids.add(node_obj.tool_id)
-    adj_list = defaultdict(list)
-    connections_xml = root_xml_element.find('Connections')
-    if connections_xml is not None:
-        for conn_xml in connections_xml.findall('Connection'):
-            origin_node = conn_xml.find('Origin')
-            dest_node = conn_xml.find('Destination')
-            if origin_node is not None and 'ToolID' in origin_node.attrib and dest_node is not None and 'ToolID' in dest_node.attrib:
-                adj_list[origin_node.attrib['ToolID']].append(dest_node.attrib['ToolID'])
-    downstream_from_sot_ids = set()
-    queue = deque(sot_initial_tool_ids)
-    visited_for_bfs = set(sot_initial_tool_ids)
-    while queue:
-        current_tool_id = queue.popleft()
-        downstream_from_sot_ids.add(current_tool_id)
-        for neighbor_tool_id in adj_list.get(current_tool_id, []):
-            if neighbor_tool_id not in visited_for_bfs:
-                visited_for_bfs.add(neighbor_tool_id)
-                queue.append(neighbor_tool_id)
-    return downstream_from_sot_ids
-
-def process_single_workflow(filepath, sot_filename_key_optional):
-    original_filename = os.path.basename(filepath)
-    file_ext = filepath.split('.')[-1].lower()
-    workflow_field_usages = []
-    last_modified_date_str = "N/A"
+    return WorkflowToolGraph.from_workflow(root_xml_element, all_nodes_map).downstream_tool_ids(sot_filename_key)
+
+# --- Schema Propagation ---
+WILDCARD_FIELD_PLACEHOLDERS = ('*AllIncomingFields*', '*UnknownOrDynamicFields*', '*FieldsFromDynamicInputTemplate*')
+SELECT_PLUGINS = ('AlteryxBasePluginsGui.AlteryxSelect.AlteryxSelect', 'AlteryxBasePluginsGui.MultiFieldSelect.MultiFieldSelect')
+SCHEMA_SOURCE_PLUGINS = ('AlteryxBasePluginsGui.InputData.InputData', 'AlteryxBasePluginsGui.DbFileInput.DbFileInput',
+                         'CalgaryPluginsGui.CalgaryInput.CalgaryInput', 'AlteryxConnectorGui.DynamicInput.DynamicInput')
+SCHEMA_APPEND_PLUGINS = ('AlteryxBasePluginsGui.Formula.Formula', 'CalgaryPluginsGui.CalgaryJoin.CalgaryJoin')
+SCHEMA_REPLACE_PLUGINS = ('AlteryxSpatialPluginsGui.Summarize.Summarize', 'AlteryxBasePluginsGui.SummarizeConfigurable.SummarizeConfigurable')
+
+def _merge_field_lists(field_lists):
+    # Alteryx field names are case-insensitive; the first spelling seen wins.
+    merged, seen = [], set()
+    for fields in field_lists:
+        for name in fields:
+            if name.casefold() not in seen:
+                seen.add(name.casefold())
+                merged.append(name)
+    return merged
+
+def _tool_output_schema(node_obj, incoming_fields, incoming_complete):
+    # A schema is (field names, complete); complete=False means more fields may flow than are known
+    # (a DynamicInput without template fields, a SELECT *, a tool with no upstream, ...).
+    if node_obj is None: return incoming_fields, False # Node failed to parse
+    plugin = node_obj.plugin
+    if plugin in SCHEMA_SOURCE_PLUGINS:
+        if plugin == 'AlteryxConnectorGui.DynamicInput.DynamicInput':
+            return list(node_obj.template_field_names), bool(node_obj.template_field_names)
+        fields = _merge_field_lists([[name for name in node_obj.output_field_names if name != '*']])
+        # A Calgary query names the fields it filters on, not every field the index returns
+        complete = bool(fields) and '*' not in node_obj.output_field_names and plugin not in CALGARY_SOURCE_PLUGINS
+        return fields, complete
+    if plugin in SCHEMA_APPEND_PLUGINS:
+        return _merge_field_lists([incoming_fields, node_obj.output_field_names]), incoming_complete
+    if plugin in SCHEMA_REPLACE_PLUGINS:
+        return _merge_field_lists([node_obj.output_field_names]), True
+    if plugin in SELECT_PLUGINS:
+        listed = {field.casefold(): (selected, rename) for field, selected, rename in node_obj.select_fields}
+        fields = []
+        for name in incoming_fields:
+            selection = listed.get(name.casefold())
+            if selection is None:
+                if node_obj.select_unknown_passthrough: fields.append(name)
+            elif selection[0]: fields.append(selection[1] or name)
+        # Selected fields the upstream schema did not reveal still exist; the Select was configured against them
+        fields = _merge_field_lists([fields, [rename or field for field, selected, rename in node_obj.select_fields if selected]])
+        return fields, incoming_complete or not node_obj.select_unknown_passthrough
+    return incoming_fields, incoming_complete # Filter, Sort, Join, outputs, ...: fields pass through
 
+def propagate_tool_schemas(all_nodes_map, tool_graph):
+    # Incoming schema of every tool, from one pass over the topological order: each tool's output
+    # schema is computed once and handed to its successors. Returns None for cyclic workflows.
+    if tool_graph.topo_order is None: return None
+    offsets, targets = tool_graph.edge_offsets, tool_graph.edge_targets
+    upstream_fields = [[] for _ in tool_graph.tool_ids]
+    upstream_complete = [None] * len(tool_graph.tool_ids) # None: no incoming connection yet
+    incoming_schemas = {}
+    for i in tool_graph.topo_order:
+        tool_id = tool_graph.tool_ids[i]
+        incoming_fields = _merge_field_lists(upstream_fields[i])
+        incoming_complete = bool(upstream_complete[i])
+        incoming_schemas[tool_id] = (incoming_fields, incoming_complete)
+        output_fields, output_complete = _tool_output_schema(all_nodes_map.get(tool_id), incoming_fields, incoming_complete)
+        for j in range(offsets[i], offsets[i + 1]):
+            upstream_fields[targets[j]].append(output_fields)
+            upstream_complete[targets[j]] = output_complete if upstream_complete[targets[j]] is None else upstream_complete[targets[j]] and output_complete
+    return incoming_schemas
+
+def expand_wildcard_fields(node_obj, incoming_schema):
+    # Field entries of a tool with placeholders replaced by one entry per concrete field. The
+    # placeholder entry is kept when the schema behind it is incomplete.
+    expanded = []
+    for field_entry in node_obj.extracted_fields:
+        placeholder = field_entry['field_name']
+        if placeholder not in WILDCARD_FIELD_PLACEHOLDERS or (incoming_schema is None and placeholder != '*FieldsFromDynamicInputTemplate*'):
+            expanded.append(field_entry)
+            continue
+        if placeholder == '*FieldsFromDynamicInputTemplate*':
+            concrete_fields, complete = node_obj.template_field_names, bool(node_obj.template_field_names)
+        elif placeholder == '*AllIncomingFields*':
+            concrete_fields, complete = incoming_schema
+        else:
+            listed = {field.casefold() for field, _, _ in node_obj.select_fields}
+            concrete_fields, complete = [name for name in incoming_schema[0] if name.casefold() not in listed], incoming_schema[1]
+        for name in concrete_fields:
+            expanded.append(dict(field_entry, field_name=name, detail=f"{field_entry['detail']} (resolved from {placeholder})"))
+        if not complete: expanded.append(field_entry)
+    return expanded
+
+def _list_workflow_files(input_directory):
+    return sorted(os.path.join(input_directory, f) for f in os.listdir(input_directory)
+                  if os.path.isfile(os.path.join(input_directory, f)) and f.lower().endswith(('.yxmd', '.xml')))
+
+def _file_last_modified(filepath):
     try:
         timestamp = os.path.getmtime(filepath) # Get mtime from original filepath
-        last_modified_date_str = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
     except FileNotFoundError:
         print(f"Warning: Original file for mtime not found: {filepath}", file=sys.stderr)
     except Exception as e:
         print(f"Warning: Could not get mtime for {filepath}: {e}", file=sys.stderr)
+    return "N/A"
+
+def scan_workflow(filepath, sot_filename_key_optional, target_matcher=None, resolve_wildcards=False):
+    # Full per-file result: the usage records plus the tool graph and Calgary root filenames,
+    # so callers that keep workflows in memory can answer lineage questions without reparsing.
+    # With resolve_wildcards, schema propagation needs every field, so nodes are built without the
+    # target matcher and target fields are filtered when the usage records are materialized.
+    original_filename = os.path.basename(filepath)
+    file_ext = filepath.split('.')[-1].lower()
+    scan = {'FilePath': filepath, 'FileName': original_filename, 'LastModified': "N/A",
+            'usages': [], 'tool_plugins': {}, 'calgary_roots': {}, 'tool_graph': WorkflowToolGraph([], [], [0], [], [], {})}
 
+    scan['LastModified'] = _file_last_modified(filepath)
 
-    if not (file_ext == 'xml' or file_ext == 'yxmd'): return []
+    if not (file_ext == 'xml' or file_ext == 'yxmd'): return scan
 
-    xml_filepath_to_parse = filepath
-    temp_xml_created = False
-    if file_ext == 'yxmd':
-        base_name = os.path.splitext(original_filename)[0]
-        temp_xml_filepath = os.path.join(os.path.dirname(filepath), f"_temp_merged_{base_name}.xml")
+    if target_matcher is not None:
         try:
-            copyfile(filepath, temp_xml_filepath)
-            xml_filepath_to_parse = temp_xml_filepath
-            temp_xml_created = True
-        except Exception as e:
-            print(f"Error copying {original_filename} to temporary XML: {e}", file=sys.stderr)
-            return []
+            with open(filepath, 'rb') as f_raw:
+                if not target_matcher.could_match_raw(f_raw.read()): return scan
+        except OSError as e:
+            print(f"Warning: Could not pre-scan {original_filename}: {e}", file=sys.stderr)
 
+    # .yxmd files are plain XML; they are parsed in place rather than through a temporary .xml copy,
+    # which would otherwise appear in (and be picked up from) the workflow directory.
     all_nodes_map = {}
     try:
-        tree = ET.parse(xml_filepath_to_parse)
-        root = tree.getroot()
-        for node_xml_element in root.findall('.//Node'):
+        root = _parse_xml_file(filepath)
+        for node_xml_element in _find_workflow_nodes(root):
             try:
-                node_obj = EnhancedNodeElement(node_xml_element)
+                node_obj = EnhancedNodeElement(node_xml_element, None if resolve_wildcards else target_matcher)
                 all_nodes_map[node_obj.tool_id] = node_obj
             except Exception: continue
-        downstream_sot_tool_ids = set()
-        if sot_filename_key_optional:
-            downstream_sot_tool_ids = get_sot_downstream_tool_ids(root, all_nodes_map, sot_filename_key_optional)
+        scan['tool_plugins'] = {tool_id: node_obj.plugin for tool_id, node_obj in all_nodes_map.items()}
+        scan['calgary_roots'] = _calgary_root_filenames(all_nodes_map)
+        scan['tool_graph'] = WorkflowToolGraph.from_edges(scan['tool_plugins'], _find_connection_edges(root), scan['calgary_roots'])
+        downstream_sot_tool_ids = scan['tool_graph'].downstream_tool_ids(sot_filename_key_optional)
+        incoming_schemas = propagate_tool_schemas(all_nodes_map, scan['tool_graph']) if resolve_wildcards else None
         for tool_id, node_obj in all_nodes_map.items():
             is_downstream = 1 if sot_filename_key_optional and tool_id in downstream_sot_tool_ids else 0
-            for field_entry in node_obj.extracted_fields:
+            field_entries = node_obj.extracted_fields
+            if resolve_wildcards:
+                field_entries = expand_wildcard_fields(node_obj, incoming_schemas.get(tool_id) if incoming_schemas is not None else None)
+                if target_matcher is not None: field_entries = [e for e in field_entries if target_matcher.matches(e['field_name'])]
+            for field_entry in field_entries:
                 plugin_name = node_obj.plugin
                 usage_criticality = TOOL_CRITICALITY_MAPPING.get(plugin_name, 0)
                 if plugin_name and plugin_name.startswith('TableauOutput') and plugin_name not in TOOL_CRITICALITY_MAPPING:
                     usage_criticality = 4
-                workflow_field_usages.append({
+                scan['usages'].append({
                     'FileName': original_filename,
-                    'LastModified': last_modified_date_str, # ADDED
+                    'LastModified': scan['LastModified'], # ADDED
                     'ToolID': tool_id,
                     'Tool': plugin_name,
                     'FieldName': field_entry['field_name'],
@@ -321,25 +757,115 @@ def process_single_workflow(filepath, sot_filename_key_optional):
                     'IsDownstreamSOT': is_downstream,
                     'UsageCriticallity': usage_criticality
                 })
-    except ET.ParseError as e_parse: print(f"XML ParseError in {original_filename}: {e_parse}", file=sys.stderr)
+    except XML_PARSE_ERRORS as e_parse: print(f"XML ParseError in {original_filename}: {e_parse}", file=sys.stderr)
     except Exception as e_proc: print(f"Unexpected error processing {original_filename}: {e_proc}", file=sys.stderr)
-    finally:
-        if temp_xml_created:
-            try: os.remove(xml_filepath_to_parse)
-            except OSError as e_os: print(f"Warning: Could not remove temp file {xml_filepath_to_parse}: {e_os}", file=sys.stderr)
-    return workflow_field_usages
+    return scan
+
+def process_single_workflow(filepath, sot_filename_key_optional, target_matcher=None, resolve_wildcards=False):
+    return scan_workflow(filepath, sot_filename_key_optional, target_matcher, resolve_wildcards)['usages']
+
+# --- Content Deduplication ---
+def workflow_content_hash(raw_bytes):
+    # CRLF vs LF never changes parse results (XML normalizes line endings), and neither does
+    # whitespace between tags, so copies that differ only in formatting share a hash. CDATA can
+    # hold raw '>' and '<', so whitespace is only collapsed when no CDATA section is present.
+    normalized = raw_bytes.replace(b'\r\n', b'\n')
+    if b'<![CDATA[' not in normalized:
+        normalized = re.sub(rb'>\s+<', b'><', normalized).strip()
+    return hashlib.sha1(normalized).hexdigest()
+
+def group_workflows_by_content(workflow_files):
+    groups = {}
+    stats = {'files': 0, 'distinct': 0, 'bytes_total': 0, 'bytes_parsed': 0}
+    for filepath in workflow_files:
+        try:
+            with open(filepath, 'rb') as f_raw: raw_bytes = f_raw.read()
+        except OSError as e:
+            print(f"Warning: Could not read {filepath} for deduplication: {e}", file=sys.stderr)
+            groups[('unreadable', filepath)] = [filepath] # Let the normal scan report the failure
+            stats['files'] += 1
+            continue
+        content_key = workflow_content_hash(raw_bytes)
+        stats['files'] += 1
+        stats['bytes_total'] += len(raw_bytes)
+        if content_key not in groups:
+            groups[content_key] = []
+            stats['bytes_parsed'] += len(raw_bytes)
+        groups[content_key].append(filepath)
+    stats['distinct'] = len(groups)
+    return list(groups.values()), stats
+
+def fan_out_usages(usages, covered_paths):
+    # Copy the representative's records to every path with the same content. Each row lists
+    # the other copies so a reviewer can see that one fix covers all of them.
+    if len(covered_paths) == 1: return {covered_paths[0]: usages}
+    names = [os.path.basename(p) for p in covered_paths]
+    fanned_out = {}
+    for filepath, file_name in zip(covered_paths, names):
+        last_modified = _file_last_modified(filepath)
+        copies = '; '.join(n for n in names if n != file_name)
+        fanned_out[filepath] = [dict(usage, FileName=file_name, LastModified=last_modified, ContentCopies=copies) for usage in usages]
+    return fanned_out
+
+def print_dedup_summary(stats):
+    skipped = stats['files'] - stats['distinct']
+    saved_mb = (stats['bytes_total'] - stats['bytes_parsed']) / (1024 * 1024)
+    share = (100.0 * skipped / stats['files']) if stats['files'] else 0.0
+    print(f"Content deduplication: {stats['files']} file(s), {stats['distinct']} distinct content(s); "
+          f"{skipped} parse(s) skipped ({share:.1f}%, {saved_mb:.1f} MB not parsed).")
+
+# --- Parser Backend Benchmark ---
+@_restores_xml_backend
+def benchmark_xml_backends(input_directory, sot_filename_key=None, repeat=3):
+    workflow_files = _list_workflow_files(input_directory)
+    if not workflow_files:
+        print(f"No .yxmd or .xml files found in '{input_directory}'.")
+        return None
+    backends = ['stdlib'] + (['lxml'] if lxml_etree is not None else [])
+    timings, results = {}, {}
+    for backend in backends:
+        set_xml_backend(backend)
+        best = None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            usages = [process_single_workflow(filepath, sot_filename_key) for filepath in workflow_files]
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[backend], results[backend] = best, usages
+    print(f"Parsed {len(workflow_files)} workflow(s), best of {max(1, repeat)} run(s):")
+    for backend in backends:
+        print(f"  {backend:<6}: {timings[backend]:.3f}s")
+    identical = all(results[backend] == results['stdlib'] for backend in backends)
+    if 'lxml' in timings:
+        print(f"  lxml speedup: {timings['stdlib'] / timings['lxml']:.2f}x")
+        print(f"  Results identical across backends: {'yes' if identical else 'NO'}")
+    else: print("  lxml is not installed; only the standard library backend was measured.")
+    return {'timings': timings, 'identical': identical, 'file_count': len(workflow_files)}
 
 # --- Output Generation ---
 def generate_output_b(all_field_usages_across_workflows, target_fields_for_output_b_set, sot_active):
     output_b_data = []
     if not target_fields_for_output_b_set: return []
+    if isinstance(target_fields_for_output_b_set, TargetFieldMatcher): is_target = target_fields_for_output_b_set.matches
+    else: is_target = target_fields_for_output_b_set.__contains__
     for usage_record in all_field_usages_across_workflows:
-        if usage_record['FieldName'] in target_fields_for_output_b_set:
+        if is_target(usage_record['FieldName']):
             if sot_active:
                 if usage_record['IsDownstreamSOT'] == 1: output_b_data.append(usage_record)
             else: output_b_data.append(usage_record)
     return output_b_data
 
+def write_output_b_csv(data_for_output_b, output_b_csv_filename, headers_b=OUTPUT_B_HEADERS):
+    try:
+        with open(output_b_csv_filename, 'w', newline='', encoding='utf-8') as f_out_b:
+            writer_b = csv.DictWriter(f_out_b, fieldnames=headers_b)
+            writer_b.writeheader()
+            writer_b.writerows(data_for_output_b)
+        print(f"Output B successfully written to '{output_b_csv_filename}'")
+        return True
+    except IOError as e: print(f"Error writing Output B to CSV '{output_b_csv_filename}': {e}", file=sys.stderr)
+    return False
+
 def load_fields_from_csv(csv_filepath):
     fields = set()
     if not csv_filepath or not os.path.exists(csv_filepath): return fields
@@ -353,15 +879,807 @@ def load_fields_from_csv(csv_filepath):
     if not fields: print(f"Warning: No field names loaded from '{csv_filepath}'.", file=sys.stderr)
     return fields
 
+# --- Sorted Output (External Sort) ---
+OUTPUT_SORT_KEYS = ('FieldName', 'FileName')
+MAX_MERGE_FAN_IN = 64 # Runs merged at once; more runs are merged in several passes
+RECORD_MEMORY_OVERHEAD = 64 # Rough per-record bytes on top of the string sizes (tuple + list slot)
+
+def _tool_id_sort_key(tool_id):
+    return (0, int(tool_id), '') if str(tool_id).isdigit() else (1, 0, str(tool_id))
+
+def usage_sort_key(sort_by, columns=None):
+    # Works on usage dicts, or on row tuples when the tuple's column order is given.
+    # Case-folded name first so every spelling of a field is contiguous, then the exact name so
+    # each exact spelling is contiguous too; the rest makes the order total and reproducible.
+    if sort_by not in OUTPUT_SORT_KEYS:
+        raise ValueError(f"Unknown sort column '{sort_by}'. Expected one of: {', '.join(OUTPUT_SORT_KEYS)}")
+    field, file_name, tool_id, context = (columns.index(c) if columns is not None else c for c in ('FieldName', 'FileName', 'ToolID', 'UsageContext'))
+    if sort_by == 'FieldName':
+        return lambda r: (r[field].casefold(), r[field], r[file_name], _tool_id_sort_key(r[tool_id]), r[context])
+    return lambda r: (r[file_name], _tool_id_sort_key(r[tool_id]), r[field].casefold(), r[field], r[context])
+
+class ExternalUsageSorter(object):
+    # Buffers usage records up to memory_budget_mb, spills each full buffer as a sorted run to disk,
+    # and k-way merges the runs. Both the in-memory sort and heapq.merge are stable, so the output
+    # equals a stable in-memory sort of all records.
+    def __init__(self, columns, sort_by='FieldName', memory_budget_mb=256, temp_dir=None):
+        self.columns = list(columns)
+        self.sort_by = sort_by
+        self._row_key = usage_sort_key(sort_by, self.columns)
+        self._budget_bytes = max(1, int(memory_budget_mb * 1024 * 1024))
+        self._temp_root = temp_dir
+        self._temp_dir = None
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._runs = []
+        self._runs_written = 0
+        self.count = 0
+
+    def add(self, record):
+        row = tuple(record.get(column, '') for column in self.columns)
+        self._buffer.append(row)
+        self._buffer_bytes += RECORD_MEMORY_OVERHEAD + sum(sys.getsizeof(value) for value in row)
+        self.count += 1
+        if self._buffer_bytes >= self._budget_bytes:
+            self._spill()
+
+    def _new_run_path(self):
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix='alteryx_usage_sort_', dir=self._temp_root)
+        self._runs_written += 1
+        return os.path.join(self._temp_dir, f"run_{self._runs_written:06d}.bin")
+
+    def _write_run(self, rows):
+        run_path = self._new_run_path()
+        # marshal keeps no memo across records (unlike pickle's), so neither writing nor reading a
+        # run accumulates the rows already processed.
+        with open(run_path, 'wb', buffering=1024 * 1024) as f_run:
+            for row in rows:
+                marshal.dump(row, f_run)
+        return run_path
+
+    def _spill(self):
+        if not self._buffer: return
+        self._buffer.sort(key=self._row_key)
+        self._runs.append(self._write_run(self._buffer))
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    @staticmethod
+    def _read_run(run_path):
+        with open(run_path, 'rb') as f_run:
+            while True:
+                try: yield marshal.load(f_run)
+                except EOFError: return
+
+    def _merge_runs(self, run_paths):
+        return heapq.merge(*(self._read_run(p) for p in run_paths), key=self._row_key)
+
+    def iter_sorted(self):
+        if not self._runs:
+            self._buffer.sort(key=self._row_key)
+            rows = iter(self._buffer)
+        else:
+            self._spill()
+            runs = self._runs
+            while len(runs) > MAX_MERGE_FAN_IN:
+                merged_runs = []
+                for start in range(0, len(runs), MAX_MERGE_FAN_IN):
+                    group = runs[start:start + MAX_MERGE_FAN_IN]
+                    merged_runs.append(self._write_run(self._merge_runs(group)))
+                    for run_path in group: os.remove(run_path)
+                runs = merged_runs
+            self._runs = runs
+            rows = self._merge_runs(runs)
+        for row in rows:
+            yield dict(zip(self.columns, row))
+
+    @property
+    def spilled_runs(self):
+        return len(self._runs)
+
+    def close(self):
+        self._buffer = []
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+        self._runs = []
+
+def iter_sorted_output_b_groups(output_b_csv_filename, group_by='FieldName', ignore_case=None):
+    # Stream (key, rows) groups from an Output B CSV written with sort_output_by=group_by. Only field
+    # names are sorted case-folded first, so only they can be grouped case-insensitively by default.
+    if ignore_case is None: ignore_case = group_by == 'FieldName'
+    with open(output_b_csv_filename, 'r', newline='', encoding='utf-8') as f_in:
+        key_func = (lambda r: r[group_by].casefold()) if ignore_case else (lambda r: r[group_by])
+        for key, rows in itertools.groupby(csv.DictReader(f_in), key=key_func):
+            yield key, list(rows)
+
+# --- Scan Snapshots and Diff ---
+SNAPSHOT_MANIFEST_FILENAME = "manifest.json"
+SNAPSHOT_USAGES_FILENAME = "usages.jsonl"
+SNAPSHOT_FORMAT_VERSION = 2 # 2: workflow entries carry their tool graph
+SNAPSHOT_READABLE_VERSIONS = (1, 2)
+# Per-usage columns stored in a snapshot; FileName/LastModified live on the workflow entry.
+# Manifest flags that change which usage rows a snapshot holds; snapshots only compare when these agree.
+SNAPSHOT_SCAN_MODE_FLAGS = ('target_fields_pushdown', 'resolve_wildcards')
+SNAPSHOT_USAGE_COLUMNS = ['ToolID', 'Tool', 'FieldName', 'UsageContext', 'FieldUsage', 'IsDownstreamSOT', 'UsageCriticallity']
+
+def _hash_text(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def hash_workflow_usages(usage_rows):
+    # usage_rows are lists in SNAPSHOT_USAGE_COLUMNS order. Rows are sorted so that
+    # reordering tools in the XML does not register as a change.
+    rows_by_node = defaultdict(list)
+    for row in usage_rows:
+        rows_by_node[row[0]].append(row)
+    node_hashes = {}
+    for tool_id, rows in rows_by_node.items():
+        node_hashes[tool_id] = _hash_text(json.dumps(sorted(rows, key=lambda r: json.dumps(r)), separators=(',', ':')))
+    workflow_hash = _hash_text(json.dumps(sorted(node_hashes.items()), separators=(',', ':')))
+    return workflow_hash, node_hashes
+
+class ScanSnapshotWriter(object):
+    def __init__(self, snapshot_dir, metadata=None):
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.metadata = dict(metadata or {})
+        self.workflows = {}
+        self._usages_file = open(os.path.join(snapshot_dir, SNAPSHOT_USAGES_FILENAME), 'wb')
+
+    def add_workflow(self, filename, usage_records, last_modified="N/A", tool_graph=None):
+        usage_rows = [[record[col] for col in SNAPSHOT_USAGE_COLUMNS] for record in usage_records]
+        workflow_hash, node_hashes = hash_workflow_usages(usage_rows)
+        line = json.dumps({'FileName': filename, 'Usages': usage_rows}, separators=(',', ':')).encode('utf-8') + b'\n'
+        offset = self._usages_file.tell()
+        self._usages_file.write(line)
+        self.workflows[filename] = {
+            'hash': workflow_hash,
+            'nodes': node_hashes,
+            'offset': offset,
+            'length': len(line),
+            'usage_count': len(usage_rows),
+            'last_modified': last_modified,
+            'graph': tool_graph.to_record() if tool_graph is not None else None
+        }
+
+    def close(self):
+        self._usages_file.close()
+        manifest = dict(self.metadata)
+        manifest.update({
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'created': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'workflows': self.workflows
+        })
+        manifest_path = os.path.join(self.snapshot_dir, SNAPSHOT_MANIFEST_FILENAME)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f_manifest:
+            json.dump(manifest, f_manifest)
+        os.replace(manifest_path + '.tmp', manifest_path) # Manifest only appears once the snapshot is complete
+
+def load_snapshot_manifest(snapshot_dir):
+    manifest_path = os.path.join(snapshot_dir, SNAPSHOT_MANIFEST_FILENAME)
+    with open(manifest_path, 'r', encoding='utf-8') as f_manifest:
+        manifest = json.load(f_manifest)
+    if manifest.get('format_version') not in SNAPSHOT_READABLE_VERSIONS:
+        raise ValueError(f"Unsupported snapshot format version {manifest.get('format_version')} in '{snapshot_dir}'")
+    return manifest
+
+def _snapshot_tool_graph(workflow_entry):
+    record = workflow_entry.get('graph')
+    return WorkflowToolGraph.from_record(record) if record is not None else None
+
+def _read_snapshot_usage_rows(usages_file, workflow_entry):
+    usages_file.seek(workflow_entry['offset'])
+    return json.loads(usages_file.read(workflow_entry['length']))['Usages']
+
+def _diff_node_rows(old_rows, new_rows):
+    # A usage is identified by (ToolID, FieldName, UsageContext); anything else differing is a change.
+    # The same identity can occur several times in one tool (e.g. SQL referenced fields), so match as multisets.
+    def by_identity(rows):
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[(row[0], row[2], row[3])].append(tuple(row))
+        return grouped
+    old_grouped, new_grouped = by_identity(old_rows), by_identity(new_rows)
+    added, removed, changed = [], [], []
+    for identity in sorted(set(old_grouped) | set(new_grouped), key=lambda k: tuple(str(p) for p in k)):
+        old_left = list(old_grouped.get(identity, []))
+        new_left = []
+        for row in new_grouped.get(identity, []):
+            if row in old_left: old_left.remove(row)
+            else: new_left.append(row)
+        old_left.sort(key=repr)
+        new_left.sort(key=repr)
+        paired = min(len(old_left), len(new_left))
+        changed.extend(zip(old_left[:paired], new_left[:paired]))
+        removed.extend(old_left[paired:])
+        added.extend(new_left[paired:])
+    return added, removed, changed
+
+def diff_scan_snapshots(old_snapshot_dir, new_snapshot_dir, output_prefix="snapshot_diff"):
+    print(f"Comparing scan snapshots '{old_snapshot_dir}' -> '{new_snapshot_dir}'")
+    old_manifest = load_snapshot_manifest(old_snapshot_dir)
+    new_manifest = load_snapshot_manifest(new_snapshot_dir)
+    if old_manifest.get('sot_filename_key') != new_manifest.get('sot_filename_key'):
+        print("Warning: Snapshots were taken with different SoT keys; IsDownstreamSOT changes are expected.", file=sys.stderr)
+    # A pushdown snapshot only holds target field usages and a resolved one holds expanded placeholder
+    # rows, so comparing across these modes would report most of the estate as added or removed.
+    for flag in SNAPSHOT_SCAN_MODE_FLAGS:
+        if bool(old_manifest.get(flag)) != bool(new_manifest.get(flag)):
+            print(f"Error: Snapshots were taken with different '{flag}' settings ({bool(old_manifest.get(flag))} vs {bool(new_manifest.get(flag))}); "
+                  f"rescan one of them with the same setting to compare.", file=sys.stderr)
+            return None
+    old_workflows, new_workflows = old_manifest['workflows'], new_manifest['workflows']
+
+    detail_rows = []
+    workflow_summary = []
+    field_summary = defaultdict(lambda: {'Added': 0, 'Removed': 0, 'Changed': 0, 'Workflows': set()})
+    compared_workflows = 0
+
+    def record(change_type, filename, old_row, new_row):
+        row = old_row if old_row is not None else new_row
+        detail_rows.append({
+            'ChangeType': change_type,
+            'FileName': filename,
+            'ToolID': row[0],
+            'Tool': row[1],
+            'FieldName': row[2],
+            'UsageContext': row[3],
+            'OldFieldUsage': old_row[4] if old_row is not None else '',
+            'NewFieldUsage': new_row[4] if new_row is not None else '',
+            'OldIsDownstreamSOT': old_row[5] if old_row is not None else '',
+            'NewIsDownstreamSOT': new_row[5] if new_row is not None else '',
+            'OldUsageCriticallity': old_row[6] if old_row is not None else '',
+            'NewUsageCriticallity': new_row[6] if new_row is not None else ''
+        })
+        field_stats = field_summary[row[2]]
+        field_stats[change_type] += 1
+        field_stats['Workflows'].add(filename)
+
+    with open(os.path.join(old_snapshot_dir, SNAPSHOT_USAGES_FILENAME), 'rb') as old_usages, \
+         open(os.path.join(new_snapshot_dir, SNAPSHOT_USAGES_FILENAME), 'rb') as new_usages:
+        for filename in sorted(set(old_workflows) | set(new_workflows)):
+            old_entry, new_entry = old_workflows.get(filename), new_workflows.get(filename)
+            if old_entry is not None and new_entry is not None and old_entry['hash'] == new_entry['hash']:
+                continue # Unchanged workflow: never read its usages
+            compared_workflows += 1
+            old_rows = _read_snapshot_usage_rows(old_usages, old_entry) if old_entry is not None else []
+            new_rows = _read_snapshot_usage_rows(new_usages, new_entry) if new_entry is not None else []
+            old_nodes = old_entry['nodes'] if old_entry is not None else {}
+            new_nodes = new_entry['nodes'] if new_entry is not None else {}
+            changed_node_ids = {tool_id for tool_id in set(old_nodes) | set(new_nodes) if old_nodes.get(tool_id) != new_nodes.get(tool_id)}
+            added, removed, changed = _diff_node_rows(
+                [row for row in old_rows if row[0] in changed_node_ids],
+                [row for row in new_rows if row[0] in changed_node_ids])
+            for row in added: record('Added', filename, None, row)
+            for row in removed: record('Removed', filename, row, None)
+            for old_row, new_row in changed: record('Changed', filename, old_row, new_row)
+            workflow_summary.append({
+                'FileName': filename,
+                'WorkflowChange': 'Added' if old_entry is None else ('Removed' if new_entry is None else 'Changed'),
+                'Added': len(added),
+                'Removed': len(removed),
+                'Changed': len(changed),
+                'ChangedNodes': len(changed_node_ids)
+            })
+
+    print(f"Workflows: {len(old_workflows)} old, {len(new_workflows)} new, {compared_workflows} changed and compared.")
+    print(f"Usage changes: {sum(1 for r in detail_rows if r['ChangeType'] == 'Added')} added, "
+          f"{sum(1 for r in detail_rows if r['ChangeType'] == 'Removed')} removed, "
+          f"{sum(1 for r in detail_rows if r['ChangeType'] == 'Changed')} changed.")
+
+    field_summary_rows = [{
+        'FieldName': field_name,
+        'Added': stats['Added'],
+        'Removed': stats['Removed'],
+        'Changed': stats['Changed'],
+        'WorkflowsAffected': len(stats['Workflows'])
+    } for field_name, stats in sorted(field_summary.items())]
+    outputs = [
+        (f"{output_prefix}_usages.csv", ['ChangeType', 'FileName', 'ToolID', 'Tool', 'FieldName', 'UsageContext',
+                                        'OldFieldUsage', 'NewFieldUsage', 'OldIsDownstreamSOT', 'NewIsDownstreamSOT',
+                                        'OldUsageCriticallity', 'NewUsageCriticallity'], detail_rows),
+        (f"{output_prefix}_by_workflow.csv", ['FileName', 'WorkflowChange', 'Added', 'Removed', 'Changed', 'ChangedNodes'], workflow_summary),
+        (f"{output_prefix}_by_field.csv", ['FieldName', 'Added', 'Removed', 'Changed', 'WorkflowsAffected'], field_summary_rows)
+    ]
+    for output_filename, headers, rows in outputs:
+        try:
+            with open(output_filename, 'w', newline='', encoding='utf-8') as f_out:
+                writer = csv.DictWriter(f_out, fieldnames=headers)
+                writer.writeheader()
+                writer.writerows(rows)
+            print(f"Snapshot diff written to '{output_filename}'")
+        except IOError as e: print(f"Error writing snapshot diff to CSV '{output_filename}': {e}", file=sys.stderr)
+    return {'usages': detail_rows, 'by_workflow': workflow_summary, 'by_field': field_summary_rows}
+
+def requery_snapshot_sot(snapshot_dir, sot_filename_key, output_b_csv_filename=None, output_b_target_fields_csv=None, target_match_mode='exact'):
+    # Answers a new SoT key from the tool graphs stored in a snapshot: IsDownstreamSOT is recomputed
+    # for every usage without reparsing any workflow.
+    manifest = load_snapshot_manifest(snapshot_dir)
+    print(f"Re-evaluating snapshot '{snapshot_dir}' for SoT key '{sot_filename_key}' (snapshot taken with '{manifest.get('sot_filename_key')}')")
+    usage_records = []
+    downstream_workflows = 0
+    with open(os.path.join(snapshot_dir, SNAPSHOT_USAGES_FILENAME), 'rb') as usages_file:
+        for file_name, entry in manifest['workflows'].items():
+            tool_graph = _snapshot_tool_graph(entry)
+            if tool_graph is None:
+                raise ValueError(f"Snapshot '{snapshot_dir}' has no stored tool graphs (format version {manifest.get('format_version')}); rescan to requery SoT keys")
+            downstream_tool_ids = tool_graph.downstream_tool_ids(sot_filename_key)
+            if downstream_tool_ids: downstream_workflows += 1
+            for row in _read_snapshot_usage_rows(usages_file, entry):
+                usage = dict(zip(SNAPSHOT_USAGE_COLUMNS, row), FileName=file_name, LastModified=entry['last_modified'])
+                usage['IsDownstreamSOT'] = 1 if usage['ToolID'] in downstream_tool_ids else 0
+                usage_records.append(usage)
+    print(f"{downstream_workflows} workflow(s) read from '{sot_filename_key}'; {sum(u['IsDownstreamSOT'] for u in usage_records)} of {len(usage_records)} usage(s) are downstream of it.")
+    if output_b_csv_filename and output_b_target_fields_csv:
+        target_fields = load_fields_from_csv(output_b_target_fields_csv)
+        data_for_output_b = generate_output_b(usage_records, TargetFieldMatcher(target_fields, target_match_mode), True) if target_fields else []
+        if data_for_output_b: write_output_b_csv(data_for_output_b, output_b_csv_filename)
+        else: print("No detailed usage found for the specified target fields for Output B.")
+    return usage_records
+
+# --- Impact Report ---
+# Downstream-SoT usages count this many times toward WeightedCriticality.
+SOT_IMPACT_WEIGHT = 2
+IMPACT_REPORT_COLUMNS = ['FileName', 'ToolID', 'Tool', 'FieldName', 'IsDownstreamSOT', 'UsageCriticallity']
+IMPACT_REPORT_CHUNK_ROWS = 1000000 # Rows per chunk when the report is built from a CSV in bounded-memory mode
+IMPACT_GROUP_SPECS = {
+    'by_field': ('FieldName', {'WorkflowCount': 'FileName', 'ToolCount': 'Tool'}),
+    'by_workflow': ('FileName', {'FieldCount': 'FieldName', 'ToolCount': 'ToolID'}),
+    'by_tool': ('Tool', {'WorkflowCount': 'FileName', 'FieldCount': 'FieldName'})
+}
+
+def _load_impact_frame(usage_source):
+    if isinstance(usage_source, str):
+        return pd.read_csv(usage_source, usecols=IMPACT_REPORT_COLUMNS, dtype={'ToolID': str},
+                           keep_default_na=False, encoding='utf-8')
+    return pd.DataFrame.from_records(usage_source, columns=IMPACT_REPORT_COLUMNS)
+
+def _prepare_impact_frame(usages, categorical=True):
+    for column in ('FileName', 'Tool', 'FieldName'):
+        usages[column] = usages[column].fillna('')
+        if categorical: usages[column] = usages[column].astype('category')
+    usages['IsDownstreamSOT'] = pd.to_numeric(usages['IsDownstreamSOT'], errors='coerce').fillna(0).astype('int8')
+    usages['UsageCriticallity'] = pd.to_numeric(usages['UsageCriticallity'], errors='coerce').fillna(0).astype('int16')
+    usages['_Weighted'] = usages['UsageCriticallity'] * (1 + (SOT_IMPACT_WEIGHT - 1) * usages['IsDownstreamSOT'])
+    return usages
+
+def _finish_impact_frame(grouped):
+    grouped['DownstreamSOTShare'] = grouped['DownstreamSOTShare'].round(4)
+    return grouped.sort_values(['WeightedCriticality', 'UsageCount'], ascending=False).reset_index()
+
+def build_impact_report(usage_source, chunk_rows=None):
+    # usage_source is a list of usage records or the path of an Output B CSV. With chunk_rows, a CSV
+    # is aggregated chunk by chunk and never held in memory whole.
+    if pd is None:
+        raise ImportError("The impact report requires pandas. Install it with 'pip install pandas'.")
+    if chunk_rows and isinstance(usage_source, str): return _build_impact_report_chunked(usage_source, chunk_rows)
+    usages = _prepare_impact_frame(_load_impact_frame(usage_source))
+
+    shared_aggregations = {
+        'UsageCount': ('UsageCriticallity', 'size'),
+        'MaxCriticality': ('UsageCriticallity', 'max'),
+        'WeightedCriticality': ('_Weighted', 'sum'),
+        'DownstreamSOTShare': ('IsDownstreamSOT', 'mean')
+    }
+    report = {}
+    for report_name, (group_column, distinct_columns) in IMPACT_GROUP_SPECS.items():
+        aggregations = dict(shared_aggregations)
+        aggregations.update({name: (column, 'nunique') for name, column in distinct_columns.items()})
+        report[report_name] = _finish_impact_frame(usages.groupby(group_column, observed=True, sort=False).agg(**aggregations))
+    return report
+
+def _build_impact_report_chunked(csv_path, chunk_rows):
+    # Sums, maxima and counts combine across chunks directly. Distinct counts keep the distinct
+    # (group, value) pairs, so memory follows the number of distinct pairs, not the number of rows.
+    totals = {report_name: None for report_name in IMPACT_GROUP_SPECS}
+    distinct_pairs = {}
+    combine = {'UsageCount': 'sum', 'MaxCriticality': 'max', 'WeightedCriticality': 'sum', 'DownstreamSum': 'sum'}
+    for chunk in pd.read_csv(csv_path, usecols=IMPACT_REPORT_COLUMNS, dtype={'ToolID': str}, keep_default_na=False,
+                             encoding='utf-8', chunksize=chunk_rows):
+        chunk = _prepare_impact_frame(chunk, categorical=False)
+        for report_name, (group_column, distinct_columns) in IMPACT_GROUP_SPECS.items():
+            partial = chunk.groupby(group_column, sort=False).agg(UsageCount=('UsageCriticallity', 'size'), MaxCriticality=('UsageCriticallity', 'max'),
+                                                                  WeightedCriticality=('_Weighted', 'sum'), DownstreamSum=('IsDownstreamSOT', 'sum'))
+            if totals[report_name] is not None: partial = pd.concat([totals[report_name], partial]).groupby(level=0, sort=False).agg(combine)
+            totals[report_name] = partial
+            for column in distinct_columns.values():
+                pairs = chunk[[group_column, column]].drop_duplicates()
+                if (report_name, column) in distinct_pairs: pairs = pd.concat([distinct_pairs[(report_name, column)], pairs]).drop_duplicates()
+                distinct_pairs[(report_name, column)] = pairs
+    report = {}
+    for report_name, (group_column, distinct_columns) in IMPACT_GROUP_SPECS.items():
+        grouped = totals[report_name]
+        if grouped is None: grouped = pd.DataFrame(columns=list(combine)).rename_axis(group_column)
+        grouped['DownstreamSOTShare'] = grouped.pop('DownstreamSum') / grouped['UsageCount']
+        for name, column in distinct_columns.items():
+            grouped[name] = distinct_pairs[(report_name, column)].groupby(group_column)[column].nunique() if (report_name, column) in distinct_pairs else 0
+        report[report_name] = _finish_impact_frame(grouped)
+    return report
+
+def generate_impact_report(usage_source, output_prefix="impact_report", chunk_rows=None):
+    try:
+        report = build_impact_report(usage_source, chunk_rows)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return None
+    for report_name, frame in report.items():
+        output_filename = f"{output_prefix}_{report_name}.csv"
+        try:
+            frame.to_csv(output_filename, index=False, encoding='utf-8')
+            print(f"Impact report ({report_name.replace('_', ' ')}, {len(frame)} rows) written to '{output_filename}'")
+        except IOError as e: print(f"Error writing impact report to CSV '{output_filename}': {e}", file=sys.stderr)
+    return report
+
+# --- Watch Daemon ---
+class WorkflowIndex(object):
+    # In-memory field index and tool graphs for every scanned workflow, keyed by file path.
+    def __init__(self, sot_filename_key=None):
+        self.sot_filename_key = sot_filename_key
+        self._lock = threading.RLock()
+        self._workflows = {}
+        self._paths_by_name = defaultdict(set)
+        self._field_postings = defaultdict(dict) # casefolded field name -> {path: [usage records]}
+        self._paths_by_calgary_root = defaultdict(set)
+        self._sot_impact_cache = {}
+        self._usage_count = 0
+        self.last_updated = None
+
+    def update(self, scan):
+        with self._lock:
+            self._remove(scan['FilePath'])
+            filepath = scan['FilePath']
+            self._workflows[filepath] = scan
+            self._paths_by_name[scan['FileName']].add(filepath)
+            self._usage_count += len(scan['usages'])
+            for usage in scan['usages']:
+                self._field_postings[usage['FieldName'].casefold()].setdefault(filepath, []).append(usage)
+            for root_filename in scan['calgary_roots'].values():
+                self._paths_by_calgary_root[root_filename].add(filepath)
+            self._touch()
+
+    def remove(self, filepath):
+        with self._lock:
+            if self._remove(filepath): self._touch()
+
+    def _remove(self, filepath):
+        scan = self._workflows.pop(filepath, None)
+        if scan is None: return False
+        self._usage_count -= len(scan['usages'])
+        self._paths_by_name[scan['FileName']].discard(filepath)
+        if not self._paths_by_name[scan['FileName']]: del self._paths_by_name[scan['FileName']]
+        for usage in scan['usages']:
+            postings = self._field_postings.get(usage['FieldName'].casefold())
+            if postings is not None:
+                postings.pop(filepath, None)
+                if not postings: del self._field_postings[usage['FieldName'].casefold()]
+        for root_filename in scan['calgary_roots'].values():
+            self._paths_by_calgary_root[root_filename].discard(filepath)
+            if not self._paths_by_calgary_root[root_filename]: del self._paths_by_calgary_root[root_filename]
+        return True
+
+    def _touch(self):
+        self._sot_impact_cache.clear()
+        self.last_updated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workflows': len(self._workflows),
+                'fields': len(self._field_postings),
+                'usages': self._usage_count,
+                'sot_filename_key': self.sot_filename_key,
+                'last_updated': self.last_updated
+            }
+
+    def field_usages(self, field_name, sot_only=False, limit=None):
+        with self._lock:
+            postings = self._field_postings.get(field_name.casefold(), {})
+            usages = [usage for filepath in sorted(postings) for usage in postings[filepath]
+                      if not sot_only or usage['IsDownstreamSOT'] == 1]
+        return {'field_name': field_name, 'usage_count': len(usages), 'workflow_count': len({u['FileName'] for u in usages}),
+                'usages': usages[:limit] if limit else usages}
+
+    def workflow_fields(self, file_name):
+        with self._lock:
+            paths = sorted(self._paths_by_name.get(file_name, ())) or ([file_name] if file_name in self._workflows else [])
+            workflows = []
+            for filepath in paths:
+                fields = defaultdict(set)
+                for usage in self._workflows[filepath]['usages']:
+                    fields[usage['FieldName']].add(usage['UsageContext'])
+                workflows.append({'FileName': os.path.basename(filepath), 'FilePath': filepath,
+                                  'Fields': {name: sorted(contexts) for name, contexts in sorted(fields.items())}})
+        return {'file_name': file_name, 'workflows': workflows}
+
+    def sot_impact(self, sot_key):
+        with self._lock:
+            cached = self._sot_impact_cache.get(sot_key)
+            if cached is not None: return cached
+            sot_paths = set()
+            for root_filename, paths in self._paths_by_calgary_root.items():
+                if sot_key in root_filename: sot_paths.update(paths)
+            workflows = []
+            for filepath in sorted(sot_paths):
+                tool_graph = self._workflows[filepath]['tool_graph']
+                downstream_tool_ids = tool_graph.downstream_tool_ids(sot_key)
+                fields = sorted({usage['FieldName'] for usage in self._workflows[filepath]['usages'] if usage['ToolID'] in downstream_tool_ids})
+                workflows.append({'FileName': os.path.basename(filepath), 'FilePath': filepath,
+                                  'SoTToolIDs': sorted(tool_graph.sot_tool_ids(sot_key)),
+                                  'DownstreamToolIDs': sorted(downstream_tool_ids),
+                                  'DownstreamFields': fields})
+            result = {'sot_key': sot_key, 'workflow_count': len(workflows), 'workflows': workflows}
+            self._sot_impact_cache[sot_key] = result
+            return result
+
+class WorkflowWatchDaemon(object):
+    def __init__(self, input_directories, sot_filename_key=None, poll_interval=2.0, resolve_wildcards=False):
+        self.input_directories = [input_directories] if isinstance(input_directories, str) else list(input_directories)
+        self.poll_interval = poll_interval
+        self.resolve_wildcards = resolve_wildcards
+        self.index = WorkflowIndex(sot_filename_key)
+        self._signatures = {} # path -> (mtime_ns, size) seen at the last poll
+        self._stop_event = threading.Event()
+        self._http_server = None
+
+    def poll_once(self):
+        # Re-parse only files whose (mtime, size) changed since the last poll.
+        current = {}
+        for input_directory in self.input_directories:
+            try: filepaths = _list_workflow_files(input_directory)
+            except OSError as e:
+                print(f"Warning: Could not list '{input_directory}': {e}", file=sys.stderr)
+                continue
+            for filepath in filepaths:
+                try: stat_result = os.stat(filepath)
+                except OSError: continue
+                current[filepath] = (stat_result.st_mtime_ns, stat_result.st_size)
+        changed = [filepath for filepath, signature in current.items() if self._signatures.get(filepath) != signature]
+        removed = [filepath for filepath in self._signatures if filepath not in current]
+        for filepath in changed:
+            self.index.update(scan_workflow(filepath, self.index.sot_filename_key, resolve_wildcards=self.resolve_wildcards))
+        for filepath in removed:
+            self.index.remove(filepath)
+        self._signatures = current
+        return changed, removed
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                changed, removed = self.poll_once()
+                if changed or removed: print(f"Index updated: {len(changed)} workflow(s) re-parsed, {len(removed)} removed.")
+            except Exception as e: print(f"Warning: Watch poll failed: {e}", file=sys.stderr)
+
+    def _make_request_handler(self):
+        index = self.index
+        class WatchRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+                limit = int(query['limit'][0]) if query.get('limit', [''])[0].isdigit() else None
+                if parts == ['status']:
+                    self._send(200, index.stats())
+                elif len(parts) == 2 and parts[0] == 'fields':
+                    self._send(200, index.field_usages(parts[1], sot_only=query.get('sot_only', ['0'])[0] == '1', limit=limit))
+                elif parts == ['sot-impact'] and query.get('key'):
+                    self._send(200, index.sot_impact(query['key'][0]))
+                elif len(parts) == 3 and parts[0] == 'workflows' and parts[2] == 'fields':
+                    self._send(200, index.workflow_fields(parts[1]))
+                else:
+                    self._send(404, {'error': 'Unknown endpoint',
+                                     'endpoints': ['/status', '/fields/<FieldName>?sot_only=1&limit=N',
+                                                   '/sot-impact?key=<SoTKey>', '/workflows/<FileName>/fields']})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Keep the console for index update messages
+        return WatchRequestHandler
+
+    def start(self, host='127.0.0.1', port=8765):
+        started = time.perf_counter()
+        changed, _ = self.poll_once()
+        print(f"Initial scan: {len(changed)} workflow(s) indexed in {time.perf_counter() - started:.1f}s.")
+        threading.Thread(target=self._watch_loop, name='workflow-watch', daemon=True).start()
+        self._http_server = ThreadingHTTPServer((host, port), self._make_request_handler())
+        print(f"Serving queries on http://{host}:{self._http_server.server_address[1]}/ (polling every {self.poll_interval}s)")
+        threading.Thread(target=self._http_server.serve_forever, name='workflow-query-api', daemon=True).start()
+        return self._http_server.server_address
+
+    def stop(self):
+        self._stop_event.set()
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+
+@_restores_xml_backend
+def run_watch_daemon(input_directories, sot_filename_key=None, host='127.0.0.1', port=8765, poll_interval=2.0, xml_backend=None, resolve_wildcards=False):
+    if xml_backend: set_xml_backend(xml_backend)
+    daemon = WorkflowWatchDaemon(input_directories, sot_filename_key, poll_interval, resolve_wildcards)
+    daemon.start(host, port)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nStopping watch daemon.")
+    finally:
+        daemon.stop()
+
+# --- Sharded Scans ---
+# A shard's partial result is a scan snapshot (see ScanSnapshotWriter) whose manifest also records
+# the shard number, shard count and the files it covered.
+SHARD_DIRNAME_TEMPLATE = "shard_{index:03d}_of_{count:03d}"
+
+def shard_for_workflow(file_name, shard_count):
+    # Hash of the file name, not the full path, so nodes mounting the share at different paths agree.
+    return int(hashlib.sha1(file_name.encode('utf-8')).hexdigest()[:12], 16) % shard_count
+
+@_restores_xml_backend
+def run_scan_shard(input_directory, shard_index, shard_count, partials_dir, sot_filename_key=None, xml_backend=None, resolve_wildcards=False):
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"shard_index must be between 0 and {shard_count - 1}, got {shard_index}")
+    if xml_backend: set_xml_backend(xml_backend)
+    if not os.path.isdir(input_directory):
+        print(f"Error: Input directory '{input_directory}' not found.", file=sys.stderr)
+        return None
+    shard_files = [filepath for filepath in _list_workflow_files(input_directory)
+                   if shard_for_workflow(os.path.basename(filepath), shard_count) == shard_index]
+    print(f"Shard {shard_index + 1}/{shard_count}: {len(shard_files)} workflow file(s) from '{input_directory}'.")
+
+    shard_dir = os.path.join(partials_dir, SHARD_DIRNAME_TEMPLATE.format(index=shard_index, count=shard_count))
+    # Write into a private directory and rename at the end, so a crashed shard never leaves a partial that looks complete.
+    working_dir = f"{shard_dir}.tmp-{socket.gethostname()}-{os.getpid()}"
+    if os.path.exists(working_dir): shutil.rmtree(working_dir)
+    snapshot_writer = ScanSnapshotWriter(working_dir, {
+        'input_directory': input_directory,
+        'sot_filename_key': sot_filename_key,
+        'target_fields_pushdown': False,
+        'resolve_wildcards': resolve_wildcards,
+        'shard_index': shard_index,
+        'shard_count': shard_count,
+        'shard_files': [os.path.basename(filepath) for filepath in shard_files],
+        'host': socket.gethostname()
+    })
+    for i, filepath in enumerate(shard_files, 1):
+        progress_message = f"Processing file {i}/{len(shard_files)}: {os.path.basename(filepath)}..."
+        sys.stdout.write(progress_message + " " * (80 - len(progress_message)) + "\r")
+        sys.stdout.flush()
+        scan = scan_workflow(filepath, sot_filename_key, resolve_wildcards=resolve_wildcards)
+        snapshot_writer.add_workflow(scan['FileName'], scan['usages'], scan['LastModified'], scan['tool_graph'])
+    sys.stdout.write(" " * 80 + "\r")
+    sys.stdout.flush()
+    snapshot_writer.close()
+    if os.path.exists(shard_dir): shutil.rmtree(shard_dir) # Rerunning a shard replaces its previous partial
+    os.replace(working_dir, shard_dir)
+    print(f"Shard partial written to '{shard_dir}'")
+    return shard_dir
+
+def _load_shard_manifests(partials_dir):
+    manifests = {}
+    for entry in sorted(os.listdir(partials_dir)):
+        shard_dir = os.path.join(partials_dir, entry)
+        if not entry.startswith('shard_') or '.tmp-' in entry or not os.path.isdir(shard_dir): continue
+        try: manifest = load_snapshot_manifest(shard_dir)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring incomplete shard partial '{shard_dir}': {e}", file=sys.stderr)
+            continue
+        if 'shard_index' not in manifest: continue
+        manifests[shard_dir] = manifest
+    return manifests
+
+def merge_shard_results(
+    partials_dir,
+    output_b_csv_filename="output_B_detailed_usage.csv",
+    output_b_target_fields_csv=None,
+    target_match_mode='exact',
+    snapshot_dir=None,
+    impact_report_prefix=None,
+    index_path=None
+    ):
+    print(f"Merging shard partials from '{partials_dir}'")
+    manifests = _load_shard_manifests(partials_dir) if os.path.isdir(partials_dir) else {}
+    if not manifests:
+        print(f"Error: No shard partials found in '{partials_dir}'.", file=sys.stderr)
+        return None
+    shard_counts = {m['shard_count'] for m in manifests.values()}
+    sot_keys = {m.get('sot_filename_key') for m in manifests.values()}
+    wildcard_modes = {bool(m.get('resolve_wildcards')) for m in manifests.values()}
+    if len(shard_counts) != 1 or len(sot_keys) != 1 or len(wildcard_modes) != 1:
+        print(f"Error: Shard partials come from different runs (shard counts {sorted(shard_counts)}, SoT keys {sorted(map(str, sot_keys))}, "
+              f"resolve_wildcards {sorted(wildcard_modes)}).", file=sys.stderr)
+        return None
+    shard_count, sot_filename_key = shard_counts.pop(), sot_keys.pop()
+    shard_dirs = {m['shard_index']: shard_dir for shard_dir, m in manifests.items()}
+    missing = [i for i in range(shard_count) if i not in shard_dirs]
+    if missing:
+        print(f"Error: Missing or failed shard(s): {', '.join(str(i) for i in missing)} of {shard_count}. "
+              f"Rerun them with run_scan_shard(..., shard_index=<n>, shard_count={shard_count}) and merge again.", file=sys.stderr)
+        return None
+
+    # Rebuild usage records in file name order, which is the order a single run processes files in.
+    workflow_sources = []
+    for shard_index in range(shard_count):
+        for file_name, entry in manifests[shard_dirs[shard_index]]['workflows'].items():
+            workflow_sources.append((file_name, shard_dirs[shard_index], entry))
+    workflow_sources.sort(key=lambda source: source[0])
+    duplicate_names = {name for name, count in Counter(source[0] for source in workflow_sources).items() if count > 1}
+    if duplicate_names:
+        print(f"Error: Workflow(s) present in more than one shard: {', '.join(sorted(duplicate_names)[:10])}", file=sys.stderr)
+        return None
+
+    all_field_usages_data = []
+    snapshot_writer = ScanSnapshotWriter(snapshot_dir, {'sot_filename_key': sot_filename_key, 'target_fields_pushdown': False,
+                                                        'resolve_wildcards': wildcard_modes.pop(), 'merged_from_shards': shard_count}) if snapshot_dir else None
+    index_builder = FieldIndexBuilder(sot_filename_key) if index_path else None
+    usages_files = {}
+    try:
+        for file_name, shard_dir, entry in workflow_sources:
+            if shard_dir not in usages_files:
+                usages_files[shard_dir] = open(os.path.join(shard_dir, SNAPSHOT_USAGES_FILENAME), 'rb')
+            usages = [dict(zip(SNAPSHOT_USAGE_COLUMNS, row), FileName=file_name, LastModified=entry['last_modified'])
+                      for row in _read_snapshot_usage_rows(usages_files[shard_dir], entry)]
+            all_field_usages_data.extend(usages)
+            tool_graph = _snapshot_tool_graph(entry)
+            if snapshot_writer is not None: snapshot_writer.add_workflow(file_name, usages, entry['last_modified'], tool_graph)
+            if index_builder is not None:
+                if tool_graph is None: raise ValueError(f"Shard partial '{shard_dir}' predates stored tool graphs; rerun it to build an index")
+                index_builder.add_workflow({'FileName': file_name, 'LastModified': entry['last_modified'], 'usages': usages, 'tool_graph': tool_graph})
+    finally:
+        for usages_file in usages_files.values(): usages_file.close()
+    if snapshot_writer is not None:
+        snapshot_writer.close()
+        print(f"Merged scan snapshot written to '{snapshot_dir}'")
+    if index_builder is not None:
+        index_stats = index_builder.write(index_path)
+        print(f"Field index written to '{index_path}': {index_stats['fields']} field(s), {index_stats['postings']} usage(s), {index_stats['bytes']} bytes.")
+    print(f"Merged {shard_count} shard(s): {len(workflow_sources)} workflow(s), {len(all_field_usages_data)} field usage instance(s).")
+
+    data_for_output_b = None
+    target_fields = load_fields_from_csv(output_b_target_fields_csv) if output_b_target_fields_csv else set()
+    if target_fields:
+        data_for_output_b = generate_output_b(all_field_usages_data, TargetFieldMatcher(target_fields, target_match_mode), bool(sot_filename_key))
+        if data_for_output_b: write_output_b_csv(data_for_output_b, output_b_csv_filename)
+        else: print("No detailed usage found for the specified target fields for Output B.")
+    else: print("Output B generation skipped as no target fields were specified or loaded.")
+    impact_rows = data_for_output_b if target_fields else all_field_usages_data
+    if impact_report_prefix and impact_rows:
+        generate_impact_report(impact_rows, impact_report_prefix)
+    return all_field_usages_data
+
 # --- Main Orchestration ---
+@_restores_xml_backend
 def analyze_alteryx_ecosystem_merged(
     input_directory,
     output_b_csv_filename="output_B_detailed_usage.csv",
     sot_filename_key=None,
-    output_b_target_fields_csv=None
+    output_b_target_fields_csv=None,
+    snapshot_dir=None,
+    target_match_mode='exact',
+    pushdown_target_fields=False,
+    impact_report_prefix=None,
+    xml_backend=None,
+    deduplicate_content=False,
+    sort_output_by=None,
+    memory_budget_mb=None,
+    index_path=None,
+    resolve_wildcards=False
     ):
     print(f"Starting Alteryx ecosystem analysis in directory: '{input_directory}'")
+    bounded_memory = memory_budget_mb is not None
+    if bounded_memory and not sort_output_by: sort_output_by = 'FieldName'
+    if sort_output_by and sort_output_by not in OUTPUT_SORT_KEYS:
+        print(f"Error: sort_output_by must be one of {', '.join(OUTPUT_SORT_KEYS)}, got '{sort_output_by}'.", file=sys.stderr)
+        return
+    if xml_backend: set_xml_backend(xml_backend)
+    print(f"XML parser backend: {get_xml_backend()}")
     sot_is_active = bool(sot_filename_key)
+    if resolve_wildcards: print("Wildcard resolution enabled: placeholder fields are expanded through schema propagation.")
     if sot_is_active: print(f"Source of Truth (SoT) key: '{sot_filename_key}' (Lineage tracing enabled)")
     else: print("No Source of Truth (SoT) key provided. Lineage tracing for SoT is disabled.")
 
@@ -376,12 +1694,22 @@ def analyze_alteryx_ecosystem_merged(
         else: print(f"Warning: No target fields loaded for Output B from '{output_b_target_fields_csv}'. Output B will not be generated.")
     else: print("No target fields CSV provided for Output B. Output B will not be generated.")
 
+    target_matcher = None
+    if generate_output_b_flag:
+        target_matcher = TargetFieldMatcher(output_b_target_fields, target_match_mode)
+        if target_match_mode != 'exact': print(f"Target field match mode: '{target_match_mode}'")
+    parse_target_matcher = None
+    if pushdown_target_fields:
+        if target_matcher is not None:
+            parse_target_matcher = target_matcher
+            print("Target field pushdown enabled: only target field usages are extracted and non-matching workflows are skipped.")
+        else: print("Warning: Target field pushdown requested but no target fields are loaded. Scanning all fields.", file=sys.stderr)
+
     all_field_usages_data = []
     if not os.path.isdir(input_directory):
         print(f"Error: Input directory '{input_directory}' not found.", file=sys.stderr)
         return
-    workflow_files = [os.path.join(input_directory, f) for f in os.listdir(input_directory)
-                      if os.path.isfile(os.path.join(input_directory, f)) and (f.lower().endswith('.yxmd') or f.lower().endswith('.xml'))]
+    workflow_files = _list_workflow_files(input_directory) # Sorted, so every run (and every shard merge) sees the same order
     if not workflow_files:
         print(f"No .yxmd or .xml files found in '{input_directory}'.")
         return
@@ -389,45 +1717,108 @@ def analyze_alteryx_ecosystem_merged(
     total_files = len(workflow_files)
     print(f"Found {total_files} workflow files to process.")
 
-    for i, filepath in enumerate(workflow_files, 1):
+    snapshot_writer = None
+    if snapshot_dir:
+        snapshot_writer = ScanSnapshotWriter(snapshot_dir, {'input_directory': input_directory, 'sot_filename_key': sot_filename_key,
+                                                            'target_fields_pushdown': parse_target_matcher is not None,
+                                                            'resolve_wildcards': resolve_wildcards})
+
+    index_builder = FieldIndexBuilder(sot_filename_key) if index_path else None
+    if index_builder is not None and bounded_memory:
+        # The builder keeps every posting and tool graph until write(), so it is not covered by the budget.
+        print(f"Warning: index_path keeps the whole field index in memory until the scan ends; "
+              f"memory use is not bounded by memory_budget_mb={memory_budget_mb}.", file=sys.stderr)
+
+    headers_b = OUTPUT_B_HEADERS + (['ContentCopies'] if deduplicate_content else [])
+    output_b_sorter = None
+    total_usage_count = 0
+    if bounded_memory:
+        # Usage records are not kept in memory; Output B rows stream into an external sorter instead.
+        print(f"Bounded-memory mode: {memory_budget_mb} MB sort buffer, Output B sorted by {sort_output_by}.")
+        if generate_output_b_flag: output_b_sorter = ExternalUsageSorter(headers_b, sort_output_by, memory_budget_mb)
+
+    dedup_stats = None
+    if deduplicate_content:
+        content_groups, dedup_stats = group_workflows_by_content(workflow_files)
+        print(f"Content deduplication enabled: {dedup_stats['distinct']} distinct workflow content(s) to parse.")
+    else: content_groups = [[filepath] for filepath in workflow_files]
+
+    total_parses = len(content_groups)
+    for i, covered_paths in enumerate(content_groups, 1):
+        filepath = covered_paths[0]
         # Processing indicator
         # Use sys.stdout.write and flush for better control with \r
-        progress_message = f"Processing file {i}/{total_files}: {os.path.basename(filepath)}..."
+        progress_message = f"Processing file {i}/{total_parses}: {os.path.basename(filepath)}..."
         sys.stdout.write(progress_message + " " * (80 - len(progress_message)) + "\r") # Pad to overwrite
         sys.stdout.flush()
-        usages_in_file = process_single_workflow(filepath, sot_filename_key)
-        all_field_usages_data.extend(usages_in_file)
+        scan = scan_workflow(filepath, sot_filename_key, parse_target_matcher, resolve_wildcards)
+        for covered_path, covered_usages in fan_out_usages(scan['usages'], covered_paths).items():
+            total_usage_count += len(covered_usages)
+            if output_b_sorter is not None:
+                for usage_record in generate_output_b(covered_usages, target_matcher, sot_is_active): output_b_sorter.add(usage_record)
+            elif not bounded_memory: all_field_usages_data.extend(covered_usages)
+            # Taken from the file, not the first usage, so workflows without usages (skipped by the pre-scan,
+            # or failing to parse) still carry their modification time, as shard partials do.
+            last_modified = scan['LastModified'] if covered_path == filepath else _file_last_modified(covered_path)
+            if snapshot_writer is not None:
+                snapshot_writer.add_workflow(os.path.basename(covered_path), covered_usages, last_modified, scan['tool_graph'])
+            if index_builder is not None:
+                index_builder.add_workflow(dict(scan, FileName=os.path.basename(covered_path), usages=covered_usages, LastModified=last_modified))
 
     sys.stdout.write(" " * 80 + "\r") # Clear the progress line
     sys.stdout.flush()
+    if snapshot_writer is not None:
+        snapshot_writer.close()
+        print(f"Scan snapshot written to '{snapshot_dir}'")
+    if index_builder is not None:
+        index_stats = index_builder.write(index_path)
+        print(f"Field index written to '{index_path}': {index_stats['fields']} field(s), {index_stats['postings']} usage(s), {index_stats['bytes']} bytes.")
+    if dedup_stats is not None:
+        print_dedup_summary(dedup_stats)
+    if parse_target_matcher is not None:
+        print(f"Pre-scan skipped {parse_target_matcher.files_skipped} of {parse_target_matcher.files_prescanned} workflow(s) containing no target field names.")
     
-    if not all_field_usages_data:
+    if not total_usage_count:
         print("No field usages found in any workflow.")
         return
-    print(f"\nTotal field usage instances extracted: {len(all_field_usages_data)}")
+    print(f"\nTotal field usage instances extracted: {total_usage_count}")
 
-    if generate_output_b_flag:
+    if output_b_sorter is not None:
         print(f"\nGenerating Output B: Detailed Usage for {len(output_b_target_fields)} target field(s)...")
-        data_for_output_b = generate_output_b(all_field_usages_data, output_b_target_fields, sot_is_active)
+        try:
+            if output_b_sorter.count:
+                if output_b_sorter.spilled_runs: print(f"Merging {output_b_sorter.spilled_runs} sorted run(s) of {output_b_sorter.count} row(s) from disk...")
+                written = write_output_b_csv(output_b_sorter.iter_sorted(), output_b_csv_filename, headers_b)
+                if written and impact_report_prefix:
+                    print("\nGenerating impact report for Output B usages...")
+                    generate_impact_report(output_b_csv_filename, impact_report_prefix, IMPACT_REPORT_CHUNK_ROWS)
+            else: print(f"No detailed usage found for the specified target fields for Output B {'(considering SoT if active)' if sot_is_active else ''}.")
+        finally: output_b_sorter.close()
+    elif bounded_memory:
+        print("\nOutput B generation skipped as no target fields were specified or loaded.")
+        if impact_report_prefix: print("Warning: The impact report over all usages needs them in memory and is skipped in bounded-memory mode.", file=sys.stderr)
+    elif generate_output_b_flag:
+        print(f"\nGenerating Output B: Detailed Usage for {len(output_b_target_fields)} target field(s)...")
+        data_for_output_b = generate_output_b(all_field_usages_data, target_matcher, sot_is_active)
         if data_for_output_b:
-            headers_b = ['FileName', 'LastModified', 'ToolID', 'Tool', 'FieldName',
-                         'UsageContext', 'FieldUsage', 'IsDownstreamSOT', 'UsageCriticallity']
-            try:
-                with open(output_b_csv_filename, 'w', newline='', encoding='utf-8') as f_out_b:
-                    writer_b = csv.DictWriter(f_out_b, fieldnames=headers_b)
-                    writer_b.writeheader()
-                    writer_b.writerows(data_for_output_b)
-                print(f"Output B successfully written to '{output_b_csv_filename}'")
-            except IOError as e: print(f"Error writing Output B to CSV '{output_b_csv_filename}': {e}", file=sys.stderr)
+            if sort_output_by: data_for_output_b.sort(key=usage_sort_key(sort_output_by))
+            write_output_b_csv(data_for_output_b, output_b_csv_filename, headers_b)
+            if impact_report_prefix:
+                print("\nGenerating impact report for Output B usages...")
+                generate_impact_report(data_for_output_b, impact_report_prefix)
         else: print(f"No detailed usage found for the specified target fields for Output B {'(considering SoT if active)' if sot_is_active else ''}.")
-    else: print("\nOutput B generation skipped as no target fields were specified or loaded.")
+    else:
+        print("\nOutput B generation skipped as no target fields were specified or loaded.")
+        if impact_report_prefix:
+            print("\nGenerating impact report for all field usages...")
+            generate_impact_report(all_field_usages_data, impact_report_prefix)
     print("\nAnalysis complete.")
 
 
 
 
 ################################################################################################
-EXAMPLE USAGE
+# EXAMPLE USAGE
 ################################################################################################
 
 WORKFLOWS_DIRECTORY_IN = "WHERE WORKFLOWS ARE BEING READ FROM"
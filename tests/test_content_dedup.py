@@ -0,0 +1,66 @@
+import csv
+import os
+
+import main
+
+WORKFLOW_XML = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\SOT_MAIN.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="CustID"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <FormulaFields><FormulaField field="{formula_field}" expression="[CustID]"/></FormulaFields></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+
+
+def test_content_hash_ignores_line_endings_and_whitespace_between_tags():
+    raw = WORKFLOW_XML.format(formula_field='Cust_SSN').encode('utf-8')
+    reformatted = raw.replace(b'\n', b'\r\n').replace(b'><Properties>', b'>\n\t<Properties>')
+    assert main.workflow_content_hash(reformatted) == main.workflow_content_hash(raw)
+    assert main.workflow_content_hash(raw.replace(b'Cust_SSN', b'Cust_Tax')) != main.workflow_content_hash(raw)
+    # Inside CDATA the whitespace is content, so it is kept
+    cdata = b'<a><![CDATA[x >  < y]]></a>'
+    assert main.workflow_content_hash(cdata) != main.workflow_content_hash(cdata.replace(b'>  <', b'><'))
+
+
+def test_fan_out_labels_every_copy():
+    usages = [{'FileName': 'a.yxmd', 'LastModified': 'N/A', 'FieldName': 'CustID'}]
+    assert main.fan_out_usages(usages, ['/x/a.yxmd']) == {'/x/a.yxmd': usages}
+    fanned_out = main.fan_out_usages(usages, ['/x/a.yxmd', '/y/b.yxmd', '/y/c.yxmd'])
+    assert [(rows[0]['FileName'], rows[0]['ContentCopies']) for rows in fanned_out.values()] == [
+        ('a.yxmd', 'b.yxmd; c.yxmd'), ('b.yxmd', 'a.yxmd; c.yxmd'), ('c.yxmd', 'a.yxmd; b.yxmd')]
+
+
+def _read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f_in:
+        return list(csv.DictReader(f_in))
+
+
+def test_deduplicated_scan_matches_a_full_scan(tmp_path):
+    estate_dir = tmp_path / 'estate'
+    estate_dir.mkdir()
+    original = WORKFLOW_XML.format(formula_field='Cust_SSN')
+    (estate_dir / 'a.yxmd').write_text(original, encoding='utf-8')
+    (estate_dir / 'b.yxmd').write_bytes(original.replace('\n', '\r\n').encode('utf-8'))
+    (estate_dir / 'c.yxmd').write_text(WORKFLOW_XML.format(formula_field='Cust_Tax'), encoding='utf-8')
+    targets_csv = tmp_path / 'targets.csv'
+    targets_csv.write_text('FieldName\nCustID\nCust_SSN\nCust_Tax\n', encoding='utf-8')
+
+    outputs = {}
+    for dedup in (False, True):
+        output_path = str(tmp_path / f'out_{dedup}.csv')
+        main.analyze_alteryx_ecosystem_merged(str(estate_dir), output_b_csv_filename=output_path, sot_filename_key='SOT_MAIN',
+                                              output_b_target_fields_csv=str(targets_csv), deduplicate_content=dedup)
+        outputs[dedup] = _read_rows(output_path)
+
+    copies = {row['FileName']: row.pop('ContentCopies') for row in outputs[True]}
+    assert copies == {'a.yxmd': 'b.yxmd', 'b.yxmd': 'a.yxmd', 'c.yxmd': ''}
+    assert outputs[True] == outputs[False]
+    last_modified = {row['FileName']: row['LastModified'] for row in outputs[True]}
+    assert last_modified['b.yxmd'] == main._file_last_modified(os.path.join(str(estate_dir), 'b.yxmd'))
@@ -0,0 +1,103 @@
+import json
+from collections import Counter
+
+import pytest
+
+import field_index
+import main
+
+WORKFLOW_XML = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\SOT_MAIN.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="CustID"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <FormulaFields><FormulaField field="Cust_SSN" expression="[SSN] + [CustID]"/></FormulaFields></Configuration></Properties></Node>
+    <Node ToolID="3"><GuiSettings Plugin="AlteryxBasePluginsGui.DbFileOutput.DbFileOutput"/><Properties><Configuration><File>out.csv</File></Configuration></Properties></Node>
+    <Node ToolID="4"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\OTHER.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="Zip"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="5"><GuiSettings Plugin="AlteryxBasePluginsGui.Filter.Filter"/><Properties><Configuration>
+      <Expression>[Zip] = "12345" AND [custid] &gt; 0</Expression></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+    <Connection><Origin ToolID="2"/><Destination ToolID="3"/></Connection>
+    <Connection><Origin ToolID="4"/><Destination ToolID="5"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+
+
+@pytest.fixture
+def workflow_path(tmp_path):
+    path = tmp_path / 'lineage.yxmd'
+    path.write_text(WORKFLOW_XML, encoding='utf-8')
+    return str(path)
+
+
+def _rows(usages):
+    return Counter(tuple(str(u[c]) for c in main.OUTPUT_B_HEADERS) for u in usages)
+
+
+def test_scan_index_reader_round_trip(workflow_path, tmp_path):
+    scan = main.scan_workflow(workflow_path, 'SOT_MAIN')
+    assert {u['ToolID'] for u in scan['usages'] if u['IsDownstreamSOT'] == 1} == {'1', '2', '3'}
+    builder = field_index.FieldIndexBuilder('SOT_MAIN')
+    builder.add_workflow(scan)
+    index_path = str(tmp_path / 'fields.idx')
+    stats = builder.write(index_path)
+    assert stats['postings'] == len(scan['usages'])
+
+    with field_index.FieldIndexReader(index_path) as reader:
+        info = reader.info()
+        assert (info['workflows'], info['usages'], info['tools'], info['edges']) == (1, len(scan['usages']), 5, 3)
+        assert info['sot_filename_key'] == 'SOT_MAIN'
+        for field_name in {u['FieldName'] for u in scan['usages']}:
+            expected = [u for u in scan['usages'] if u['FieldName'].casefold() == field_name.casefold()]
+            assert _rows(reader.field_usages(field_name.upper())) == _rows(expected)
+        assert reader.field_usages('NoSuchField') == []
+
+        # A different SoT key is answered from the stored graph and matches a fresh scan with that key
+        rescan = main.scan_workflow(workflow_path, 'OTHER')
+        assert _rows(reader.field_usages('custid', sot_key='OTHER')) == _rows(
+            [u for u in rescan['usages'] if u['FieldName'].casefold() == 'custid'])
+
+        impact = reader.sot_impact('OTHER')
+        assert impact['workflow_count'] == 1
+        assert impact['workflows'][0]['SoTToolIDs'] == ['4']
+        assert sorted(impact['workflows'][0]['DownstreamToolIDs']) == ['4', '5']
+        assert impact['workflows'][0]['DownstreamFields'] == sorted({u['FieldName'] for u in scan['usages'] if u['ToolID'] in ('4', '5')})
+
+
+def test_reader_rejects_other_index_versions(tmp_path):
+    index_path = str(tmp_path / 'fields.idx')
+    field_index.FieldIndexBuilder().write(index_path)
+    with open(index_path, 'r+b') as f_index:
+        f_index.seek(8)
+        f_index.write(field_index.U32.pack(field_index.INDEX_VERSION + 1))
+    with pytest.raises(ValueError):
+        field_index.FieldIndexReader(index_path)
+
+
+def test_query_cli_accepts_json_after_subcommand(workflow_path, tmp_path, capsys):
+    builder = field_index.FieldIndexBuilder('SOT_MAIN')
+    builder.add_workflow(main.scan_workflow(workflow_path, 'SOT_MAIN'))
+    index_path = str(tmp_path / 'fields.idx')
+    builder.write(index_path)
+    capsys.readouterr()
+    assert field_index.main([index_path, 'field', 'cust_ssn', '--json']) == 0
+    usages = json.loads(capsys.readouterr().out)
+    assert usages and {(u['ToolID'], u['FieldName']) for u in usages} == {('2', 'Cust_SSN')}
+    assert field_index.main([index_path, 'sot-impact', 'SOT_MAIN', '--json']) == 0
+    assert json.loads(capsys.readouterr().out)['workflow_count'] == 1
+
+
+def test_index_with_memory_budget_warns_that_it_is_not_bounded(workflow_path, tmp_path, capsys):
+    index_path = str(tmp_path / 'fields.idx')
+    main.analyze_alteryx_ecosystem_merged(str(tmp_path), output_b_csv_filename=str(tmp_path / 'out.csv'),
+                                          sot_filename_key='SOT_MAIN', memory_budget_mb=1, index_path=index_path)
+    assert 'not bounded by memory_budget_mb' in capsys.readouterr().err
+    with field_index.FieldIndexReader(index_path) as reader:
+        assert reader.info()['workflows'] == 1
@@ -0,0 +1,76 @@
+import pytest
+
+import main
+
+WORKFLOW_XML = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="AlteryxBasePluginsGui.InputData.InputData"/><Properties><Configuration><File>a.csv</File>
+      <FormatSpecificOptions><FieldNames><Field name="CustID"/><Field name="SSN"/><Field name="Name"/><Field name="Zip"/></FieldNames></FormatSpecificOptions></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.AlteryxSelect.AlteryxSelect"/><Properties><Configuration>
+      <SelectFields><SelectField field="SSN" selected="False"/><SelectField field="Name" selected="True" rename="FullName"/><SelectField field="*Unknown" selected="True"/></SelectFields>
+      <SelectConfiguration DeselectUnknown="False"/></Configuration></Properties></Node>
+    <Node ToolID="3"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <FormulaFields><FormulaField field="ZipPrefix" expression="Left([Zip],3)"/></FormulaFields></Configuration></Properties></Node>
+    <Node ToolID="4"><GuiSettings Plugin="AlteryxBasePluginsGui.DbFileOutput.DbFileOutput"/><Properties><Configuration><File>out.csv</File></Configuration></Properties></Node>
+    <Node ToolID="5"><GuiSettings Plugin="AlteryxConnectorGui.DynamicInput.DynamicInput"/><Properties><Configuration>
+      <InputConfiguration><Configuration><File>t.csv</File><FormatSpecificOptions><FieldNames><Field name="Region"/><Field name="Sales"/></FieldNames></FormatSpecificOptions></Configuration></InputConfiguration>
+      <InputSourceTemplate>t.csv</InputSourceTemplate></Configuration></Properties></Node>
+    <Node ToolID="6"><GuiSettings Plugin="AlteryxBasePluginsGui.SummarizeConfigurable.SummarizeConfigurable"/><Properties><Configuration>
+      <SummarizeFields><SummarizeField field="Region" action="GroupBy"/><SummarizeField field="Sales" action="Sum" rename="TotalSales"/></SummarizeFields></Configuration></Properties></Node>
+    <Node ToolID="7"><GuiSettings Plugin="AlteryxBasePluginsGui.DbFileOutput.DbFileOutput"/><Properties><Configuration><File>sum.csv</File></Configuration></Properties></Node>
+    <Node ToolID="8"><GuiSettings Plugin="AlteryxBasePluginsGui.DbFileInput.DbFileInput"/><Properties><Configuration><Query>SELECT * FROM T</Query></Configuration></Properties></Node>
+    <Node ToolID="9"><GuiSettings Plugin="AlteryxBasePluginsGui.DbFileOutput.DbFileOutput"/><Properties><Configuration><File>star.csv</File></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+    <Connection><Origin ToolID="2"/><Destination ToolID="3"/></Connection>
+    <Connection><Origin ToolID="3"/><Destination ToolID="4"/></Connection>
+    <Connection><Origin ToolID="5"/><Destination ToolID="6"/></Connection>
+    <Connection><Origin ToolID="6"/><Destination ToolID="7"/></Connection>
+    <Connection><Origin ToolID="8"/><Destination ToolID="9"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+
+
+@pytest.fixture
+def workflow_path(tmp_path):
+    path = tmp_path / 'schema.yxmd'
+    path.write_text(WORKFLOW_XML, encoding='utf-8')
+    return str(path)
+
+
+def _fields_by_tool(usages, context):
+    fields = {}
+    for usage in usages:
+        if usage['UsageContext'] == context: fields.setdefault(usage['ToolID'], []).append(usage['FieldName'])
+    return fields
+
+
+def test_placeholders_expand_to_propagated_fields(workflow_path):
+    usages = main.process_single_workflow(workflow_path, None, resolve_wildcards=True)
+    outputs = _fields_by_tool(usages, 'dbfileoutput_generic_output')
+    assert outputs['4'] == ['CustID', 'FullName', 'Zip', 'ZipPrefix'] # SSN deselected, Name renamed, ZipPrefix added
+    assert outputs['7'] == ['Region', 'TotalSales'] # Summarize replaces the DynamicInput template schema
+    assert outputs['9'] == ['*AllIncomingFields*'] # SELECT * stays unknown
+    assert _fields_by_tool(usages, 'select_dynamic_passthrough')['2'] == ['CustID', 'Zip']
+    assert _fields_by_tool(usages, 'dynamicinput_template_field')['5'] == ['Region', 'Sales']
+
+
+def test_resolution_is_opt_in(workflow_path):
+    usages = main.process_single_workflow(workflow_path, None)
+    assert _fields_by_tool(usages, 'dbfileoutput_generic_output') == {tool_id: ['*AllIncomingFields*'] for tool_id in ('4', '7', '9')}
+
+
+def test_pushdown_with_resolution_filters_after_expansion(workflow_path):
+    matcher = main.TargetFieldMatcher({'ssn', 'zip', 'sales', 'fullname'}, 'ignorecase')
+    pushed_down = main.process_single_workflow(workflow_path, None, matcher, resolve_wildcards=True)
+    filtered = [u for u in main.process_single_workflow(workflow_path, None, resolve_wildcards=True) if matcher.matches(u['FieldName'])]
+    assert pushed_down == filtered
+    assert ('4', 'Zip') in {(u['ToolID'], u['FieldName']) for u in pushed_down}
+
+
+def test_cyclic_workflow_keeps_placeholders():
+    graph = main.WorkflowToolGraph.from_edges({'1': 'P', '2': 'P'}, [('1', '2'), ('2', '1')])
+    assert main.propagate_tool_schemas({}, graph) is None
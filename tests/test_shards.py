@@ -0,0 +1,75 @@
+import shutil
+
+import pytest
+
+import main
+
+WORKFLOW_XML = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\{root}.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="CustID"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <FormulaFields><FormulaField field="Field_{number}" expression="[CustID] + [Cust_SSN]"/></FormulaFields></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+SHARD_COUNT = 3
+
+
+@pytest.fixture
+def estate(tmp_path):
+    estate_dir = tmp_path / 'estate'
+    estate_dir.mkdir()
+    for number in range(12):
+        root = 'SOT_MAIN' if number % 3 else 'OTHER'
+        (estate_dir / f'wf_{number:02d}.yxmd').write_text(WORKFLOW_XML.format(root=root, number=number), encoding='utf-8')
+    (estate_dir / 'broken.yxmd').write_text('<AlteryxDocument><Nodes>', encoding='utf-8')
+    targets_csv = tmp_path / 'targets.csv'
+    targets_csv.write_text('FieldName\nCustID\nCust_SSN\nField_4\n', encoding='utf-8')
+    return str(estate_dir), str(targets_csv)
+
+
+def _run_shards(estate_dir, partials_dir, **kwargs):
+    for shard_index in range(SHARD_COUNT):
+        assert main.run_scan_shard(estate_dir, shard_index, SHARD_COUNT, partials_dir, 'SOT_MAIN', **kwargs) is not None
+
+
+def _workflow_entries(snapshot_dir):
+    workflows = main.load_snapshot_manifest(snapshot_dir)['workflows']
+    return {name: (entry['hash'], entry['usage_count'], entry['last_modified'], entry['graph']) for name, entry in workflows.items()}
+
+
+def test_merged_shards_match_a_single_run(estate, tmp_path):
+    estate_dir, targets_csv = estate
+    single_csv, merged_csv = str(tmp_path / 'single.csv'), str(tmp_path / 'merged.csv')
+    main.analyze_alteryx_ecosystem_merged(estate_dir, output_b_csv_filename=single_csv, sot_filename_key='SOT_MAIN',
+                                          output_b_target_fields_csv=targets_csv, snapshot_dir=str(tmp_path / 'single_snap'))
+    partials_dir = str(tmp_path / 'partials')
+    _run_shards(estate_dir, partials_dir)
+    merged_usages = main.merge_shard_results(partials_dir, merged_csv, output_b_target_fields_csv=targets_csv,
+                                             snapshot_dir=str(tmp_path / 'merged_snap'))
+
+    assert len(merged_usages) == 12 * 5
+    with open(single_csv, 'rb') as f_single, open(merged_csv, 'rb') as f_merged:
+        assert f_merged.read() == f_single.read()
+    single_entries = _workflow_entries(str(tmp_path / 'single_snap'))
+    assert len(single_entries) == 13 and single_entries['broken.yxmd'][1] == 0
+    assert _workflow_entries(str(tmp_path / 'merged_snap')) == single_entries
+
+
+def test_merge_refuses_incomplete_or_mixed_partials(estate, tmp_path, capsys):
+    estate_dir, _ = estate
+    partials_dir = str(tmp_path / 'partials')
+    _run_shards(estate_dir, partials_dir)
+    shutil.rmtree(str(tmp_path / 'partials' / main.SHARD_DIRNAME_TEMPLATE.format(index=1, count=SHARD_COUNT)))
+    assert main.merge_shard_results(partials_dir, str(tmp_path / 'out.csv')) is None
+    assert 'Missing or failed shard(s): 1' in capsys.readouterr().err
+
+    main.run_scan_shard(estate_dir, 1, SHARD_COUNT, partials_dir, 'SOT_MAIN', resolve_wildcards=True)
+    assert main.merge_shard_results(partials_dir, str(tmp_path / 'out.csv')) is None
+    assert 'different runs' in capsys.readouterr().err
@@ -0,0 +1,72 @@
+import os
+
+import main
+
+WORKFLOW_XML = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\SOT_MAIN.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="CustID"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <FormulaFields><FormulaField field="{formula_field}" expression="[SSN] + [CustID]"/></FormulaFields></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+
+
+def _write_estate(directory, formula_field, extra_files=()):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'lineage.yxmd'), 'w', encoding='utf-8') as f_out:
+        f_out.write(WORKFLOW_XML.format(formula_field=formula_field))
+    for file_name, content in extra_files:
+        with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as f_out:
+            f_out.write(content)
+
+
+def _snapshot(tmp_path, estate_dir, name, **kwargs):
+    snapshot_dir = str(tmp_path / name)
+    main.analyze_alteryx_ecosystem_merged(estate_dir, output_b_csv_filename=str(tmp_path / (name + '.csv')),
+                                          sot_filename_key='SOT_MAIN', snapshot_dir=snapshot_dir, **kwargs)
+    return snapshot_dir
+
+
+def test_snapshot_records_file_mtime_for_workflows_without_usages(tmp_path):
+    estate_dir = str(tmp_path / 'estate')
+    _write_estate(estate_dir, 'Cust_SSN', [('broken.yxmd', '<AlteryxDocument><Nodes>')])
+    manifest = main.load_snapshot_manifest(_snapshot(tmp_path, estate_dir, 'snap'))
+    broken = manifest['workflows']['broken.yxmd']
+    assert broken['usage_count'] == 0
+    assert broken['last_modified'] == main._file_last_modified(os.path.join(estate_dir, 'broken.yxmd'))
+    assert broken['last_modified'] != 'N/A'
+
+
+def test_diff_reports_added_removed_and_changed_usages(tmp_path):
+    old_dir, new_dir = str(tmp_path / 'old'), str(tmp_path / 'new')
+    _write_estate(old_dir, 'Cust_SSN')
+    _write_estate(new_dir, 'Cust_Tax', [('extra.yxmd', WORKFLOW_XML.format(formula_field='Extra'))])
+    old_snapshot = _snapshot(tmp_path, old_dir, 'old_snap')
+    new_snapshot = _snapshot(tmp_path, new_dir, 'new_snap')
+
+    result = main.diff_scan_snapshots(old_snapshot, new_snapshot, output_prefix=str(tmp_path / 'diff'))
+    by_workflow = {row['FileName']: row for row in result['by_workflow']}
+    assert by_workflow['extra.yxmd']['WorkflowChange'] == 'Added'
+    assert by_workflow['lineage.yxmd']['WorkflowChange'] == 'Changed'
+    lineage_changes = {(row['ChangeType'], row['FieldName']) for row in result['usages'] if row['FileName'] == 'lineage.yxmd'}
+    assert ('Added', 'Cust_Tax') in lineage_changes and ('Removed', 'Cust_SSN') in lineage_changes
+    assert not any(row['FieldName'] == 'CustID' for row in result['usages'] if row['FileName'] == 'lineage.yxmd')
+    assert os.path.exists(str(tmp_path / 'diff_usages.csv'))
+
+    assert main.diff_scan_snapshots(old_snapshot, old_snapshot, output_prefix=str(tmp_path / 'same'))['usages'] == []
+
+
+def test_diff_refuses_snapshots_from_different_scan_modes(tmp_path, capsys):
+    estate_dir = str(tmp_path / 'estate')
+    _write_estate(estate_dir, 'Cust_SSN')
+    full_snapshot = _snapshot(tmp_path, estate_dir, 'full')
+    resolved_snapshot = _snapshot(tmp_path, estate_dir, 'resolved', resolve_wildcards=True)
+    assert main.diff_scan_snapshots(full_snapshot, resolved_snapshot, output_prefix=str(tmp_path / 'diff')) is None
+    assert "'resolve_wildcards'" in capsys.readouterr().err
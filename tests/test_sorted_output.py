@@ -0,0 +1,60 @@
+import csv
+import random
+
+import pytest
+
+import main
+
+
+def _usage(rng, file_name=None):
+    return {
+        'FileName': file_name or f"{rng.choice(['wf', 'WF', 'Wf'])}_{rng.randrange(40)}.yxmd",
+        'LastModified': '2024-01-01 00:00:00',
+        'ToolID': str(rng.randrange(30)) if rng.random() < 0.9 else f"T{rng.randrange(5)}",
+        'Tool': 'AlteryxBasePluginsGui.Formula.Formula',
+        'FieldName': rng.choice(['Cust', 'cust', 'CUST', 'SSN', 'Zip', 'zip']) + str(rng.randrange(20)),
+        'UsageContext': rng.choice(['formula_output_field', 'formula_expression_input']),
+        'FieldUsage': f"[x] + {rng.randrange(1000)}",
+        'IsDownstreamSOT': rng.randrange(2),
+        'UsageCriticallity': rng.randrange(5)
+    }
+
+
+@pytest.mark.parametrize('sort_by', main.OUTPUT_SORT_KEYS)
+def test_external_sort_matches_in_memory_sort(sort_by, tmp_path):
+    rng = random.Random(sort_by)
+    records = [_usage(rng) for _ in range(6000)]
+    sorter = main.ExternalUsageSorter(main.OUTPUT_B_HEADERS, sort_by, memory_budget_mb=0.01, temp_dir=str(tmp_path))
+    try:
+        for record in records: sorter.add(record)
+        assert sorter.spilled_runs > main.MAX_MERGE_FAN_IN # Forces a multi-pass merge
+        assert list(sorter.iter_sorted()) == sorted(records, key=main.usage_sort_key(sort_by))
+    finally:
+        sorter.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sorted_groups_follow_the_sort_order(tmp_path):
+    rng = random.Random(7)
+    records = [_usage(rng, file_name) for file_name in ('A.yxmd', 'B.yxmd', 'a.yxmd') for _ in range(3)]
+    csv_path = str(tmp_path / 'output_b.csv')
+    for sort_by, expected_keys in (('FileName', ['A.yxmd', 'B.yxmd', 'a.yxmd']), ('FieldName', None)):
+        main.write_output_b_csv(sorted(records, key=main.usage_sort_key(sort_by)), csv_path)
+        keys = [key for key, _ in main.iter_sorted_output_b_groups(csv_path, sort_by)]
+        assert len(keys) == len(set(keys))
+        if expected_keys: assert keys == expected_keys
+        else: assert keys == sorted({r['FieldName'].casefold() for r in records})
+
+
+def test_chunked_impact_report_matches_in_memory_report(tmp_path):
+    pd = pytest.importorskip('pandas')
+    rng = random.Random(11)
+    csv_path = str(tmp_path / 'output_b.csv')
+    main.write_output_b_csv([_usage(rng) for _ in range(3000)], csv_path)
+    expected = main.build_impact_report(csv_path)
+    chunked = main.build_impact_report(csv_path, chunk_rows=257)
+    for report_name, frame in expected.items():
+        assert list(chunked[report_name].columns) == list(frame.columns)
+        key = frame.columns[0]
+        pd.testing.assert_frame_equal(chunked[report_name].sort_values(key).reset_index(drop=True),
+                                      frame.sort_values(key).reset_index(drop=True), check_dtype=False, check_categorical=False)
@@ -0,0 +1,132 @@
+import contextlib
+import io
+import random
+import re
+
+import pytest
+
+import main
+
+
+def _reference_match(targets, mode, name):
+    fold = (lambda s: s) if mode == 'exact' else str.casefold
+    for target in targets:
+        if mode == 'glob' and target.startswith(main.REGEX_TARGET_PREFIX):
+            try:
+                if re.fullmatch(target[len(main.REGEX_TARGET_PREFIX):], fold(name), re.DOTALL | re.IGNORECASE): return True
+            except re.error: pass
+        elif mode == 'glob' and any(c in target for c in main.GLOB_WILDCARD_CHARS):
+            if re.fullmatch(main._glob_to_regex(fold(target)), fold(name), re.DOTALL | re.IGNORECASE): return True
+        elif fold(target) == fold(name): return True
+    return False
+
+
+def test_trie_regex_matches_exactly_its_words():
+    words = {'Cust', 'CustID', 'Cust_SSN', 'a.b', 'x+y', 'Größe'}
+    automaton = re.compile(main._trie_regex(words))
+    for candidate in words | {'Cus', 'CustI', 'CustIDs', 'aXb', 'x+', ''}:
+        assert (automaton.fullmatch(candidate) is not None) == (candidate in words)
+
+
+@pytest.mark.parametrize('mode, name, expected', [
+    ('exact', 'Cust_SSN', True),
+    ('exact', 'cust_ssn', False),
+    ('ignorecase', 'CUST_ssn', True),
+    ('ignorecase', 'STRASSE', True), # casefold('Straße') == 'strasse'
+    ('glob', 'PII_Name', True), # prefix
+    ('glob', 'Home_Phone', True), # suffix
+    ('glob', 'old_ssn_v2', True), # infix
+    ('glob', 'PII_cust_ID', True), # compound
+    ('glob', 'Zip5', True), # '?' and class
+    ('glob', 'ZipA', False), # [!A-Z]
+    ('glob', 'Acct_1234', True), # re:
+    ('glob', 'Acct_12', False),
+    ('glob', 'Unrelated', False),
+])
+def test_matcher_shapes(mode, name, expected):
+    targets = {'Cust_SSN', 'Straße'} if mode != 'glob' else {'PII_*', '*_phone', '*SSN*', 'PII_*_ID', 'Zip[!A-Z]', r're:acct_\d{4}'}
+    assert main.TargetFieldMatcher(targets, mode).matches(name) is expected
+
+
+def test_regex_entries_are_compiled_independently():
+    # Each of these broke, or silently changed, a single combined regex
+    matcher = main.TargetFieldMatcher({r're:(a)\1', r're:(b)\1', 're:(?P<x>c)d', 're:(?P<x>e)f', 're:(?i)ghi', 'Literal'}, 'glob')
+    assert matcher.matches('aa') and matcher.matches('bb') and not matcher.matches('ab')
+    assert matcher.matches('cd') and matcher.matches('ef')
+    assert matcher.matches('GHI') and matcher.matches('literal')
+    assert matcher.pattern_counts['general'] == 5
+
+
+def test_invalid_regex_entry_is_skipped_with_a_warning():
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        matcher = main.TargetFieldMatcher({'re:(unclosed', 'Cust'}, 'glob')
+    assert 'Skipping invalid target regex' in stderr.getvalue()
+    assert matcher.matches('cust') and not matcher.matches('(unclosed')
+
+
+def test_match_results_are_cached():
+    matcher = main.TargetFieldMatcher({'*SSN*'}, 'glob')
+    assert matcher.matches('Cust_SSN') and not matcher.matches('Zip')
+    assert matcher._match_cache == {'Cust_SSN': True, 'Zip': False}
+
+
+def test_matcher_agrees_with_reference_on_random_targets():
+    rng = random.Random(3)
+    alphabet = 'abAB_sS1ßẞé'
+    def word(n): return ''.join(rng.choice(alphabet) for _ in range(n))
+    for _ in range(1500):
+        mode = rng.choice(main.TARGET_MATCH_MODES)
+        targets = set()
+        for _ in range(rng.randint(1, 8)):
+            shape = rng.random()
+            if shape < 0.3: targets.add(word(rng.randint(1, 4)))
+            elif shape < 0.45: targets.add(word(rng.randint(1, 3)) + '*')
+            elif shape < 0.6: targets.add('*' + word(rng.randint(1, 3)))
+            elif shape < 0.8: targets.add('*' + word(rng.randint(1, 2)) + rng.choice(['*', '?', '[ab]', '[!a]']) + word(rng.randint(0, 2)) + rng.choice(['', '*']))
+            elif shape < 0.9: targets.add(rng.choice([r're:(a)\1', r're:(b)\1', 're:(?P<x>a)b', 're:(?P<x>s)S', 're:(?i)abc', 're:[ab]+']))
+            else: targets.add(rng.choice(['*', '?', '??']))
+        matcher = main.TargetFieldMatcher(targets, mode)
+        for _ in range(30):
+            name = word(rng.randint(0, 7))
+            assert matcher.matches(name) == _reference_match(targets, mode, name), (mode, targets, name)
+
+
+def test_xml_escaped_variants_cover_double_escaping():
+    assert main._xml_escaped_variants('A&B') == {'A&B', 'A&amp;B', 'A&amp;amp;B'}
+
+
+@pytest.mark.parametrize('mode', main.TARGET_MATCH_MODES)
+def test_prescan_finds_escaped_and_nested_names(mode):
+    targets = {'A&B'} if mode != 'glob' else {'A&B*'}
+    matcher = main.TargetFieldMatcher(targets, mode)
+    attribute = b'<SelectField field="A&amp;B" selected="True"/>'
+    calgary_query = b'<Query>&lt;Query&gt;&lt;Field name=&quot;A&amp;amp;B&quot;/&gt;&lt;/Query&gt;</Query>'
+    assert matcher.could_match_raw(attribute)
+    assert matcher.could_match_raw(calgary_query)
+    assert not matcher.could_match_raw(b'<SelectField field="AB"/>')
+    assert (matcher.files_prescanned, matcher.files_skipped) == (3, 1)
+
+
+def test_prescan_handles_utf16_and_case_folding():
+    raw = '<Field name="STRASSE"/>'.encode('utf-16')
+    assert main.TargetFieldMatcher({'Straße'}, 'ignorecase').could_match_raw(raw)
+    assert not main.TargetFieldMatcher({'Straße'}, 'exact').could_match_raw(raw)
+    assert main.TargetFieldMatcher({'STRASSE'}, 'exact').could_match_raw(raw)
+
+
+def test_prescan_is_disabled_by_unanchored_patterns():
+    for targets in ({'re:cust.*'}, {'*'}, {'Cust', '??'}):
+        matcher = main.TargetFieldMatcher(targets, 'glob')
+        assert matcher.could_match_raw(b'<Nodes/>')
+        assert matcher.files_skipped == 0
+
+
+def test_exact_prescan_searches_utf8_bytes_without_decoding():
+    matcher = main.TargetFieldMatcher({'Größe', 'A&B'}, 'exact')
+    assert matcher._prescan_bytes_automaton is not None
+    assert matcher.could_match_raw('<Field name="Größe"/>'.encode('utf-8'))
+    assert matcher.could_match_raw(b'<Field name="A&amp;B"/>')
+    assert not matcher.could_match_raw('<Field name="Grösse"/>'.encode('utf-8'))
+    assert not matcher.could_match_raw(b'\xff\xfe not utf-8 \xc3')
+    assert main.TargetFieldMatcher({'Cust'}, 'ignorecase')._prescan_bytes_automaton is None
@@ -0,0 +1,42 @@
+import json
+import random
+from collections import deque
+
+import main
+
+
+def _bfs_reachable(edges, seeds):
+    adjacency = {}
+    for origin, dest in edges:
+        adjacency.setdefault(origin, []).append(dest)
+    reached = set(seeds)
+    queue = deque(seeds)
+    while queue:
+        for successor in adjacency.get(queue.popleft(), []):
+            if successor not in reached:
+                reached.add(successor)
+                queue.append(successor)
+    return reached
+
+
+def test_downstream_tool_ids_matches_bfs_on_random_graphs():
+    rng = random.Random(1234)
+    for _ in range(2000):
+        tool_ids = [str(i) for i in range(rng.randint(0, 15))]
+        # 'x'/'y' stand in for connections to nodes that failed to parse
+        endpoints = tool_ids + ['x', 'y']
+        edges = [(rng.choice(endpoints), rng.choice(endpoints)) for _ in range(rng.randint(0, 25))] if tool_ids else []
+        roots = {t: rng.choice(['SOT.cydb', 'OTHER.cydb']) for t in tool_ids if rng.random() < 0.3}
+        graph = main.WorkflowToolGraph.from_edges({t: 'Plugin' for t in tool_ids}, edges, roots)
+        expected = _bfs_reachable(edges, {t for t, root in roots.items() if 'SOT' in root})
+        assert graph.downstream_tool_ids('SOT') == expected
+        restored = main.WorkflowToolGraph.from_record(json.loads(json.dumps(graph.to_record())))
+        assert restored.downstream_tool_ids('SOT') == expected
+
+
+def test_topological_order_is_none_only_for_cycles():
+    acyclic = main.WorkflowToolGraph.from_edges({'1': 'P', '2': 'P', '3': 'P'}, [('1', '2'), ('2', '3'), ('1', '3')])
+    assert acyclic.topo_order.tolist() == [0, 1, 2]
+    cyclic = main.WorkflowToolGraph.from_edges({'1': 'P', '2': 'P'}, [('1', '2'), ('2', '1')], {'1': 'SOT.cydb'})
+    assert cyclic.topo_order is None
+    assert cyclic.downstream_tool_ids('SOT') == {'1', '2'}
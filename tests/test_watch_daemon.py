@@ -0,0 +1,82 @@
+import json
+import os
+from urllib.request import urlopen
+
+import main
+
+WORKFLOW_XML = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\{root}.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="CustID"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <FormulaFields><FormulaField field="{formula_field}" expression="[CustID]"/></FormulaFields></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+
+
+def _write(directory, file_name, formula_field, root='SOT_MAIN'):
+    path = os.path.join(str(directory), file_name)
+    with open(path, 'w', encoding='utf-8') as f_out:
+        f_out.write(WORKFLOW_XML.format(root=root, formula_field=formula_field))
+    return path
+
+
+def _fresh_index(directory):
+    index = main.WorkflowIndex('SOT_MAIN')
+    for filepath in main._list_workflow_files(str(directory)):
+        index.update(main.scan_workflow(filepath, 'SOT_MAIN'))
+    return index
+
+
+def _assert_same_index(index, expected, field_names):
+    assert index.stats()['workflows'] == expected.stats()['workflows']
+    assert index.stats()['fields'] == expected.stats()['fields']
+    assert index.stats()['usages'] == expected.stats()['usages']
+    for field_name in field_names:
+        assert index.field_usages(field_name) == expected.field_usages(field_name)
+    assert index.sot_impact('SOT_MAIN') == expected.sot_impact('SOT_MAIN')
+
+
+def test_poll_once_tracks_added_changed_and_deleted_workflows(tmp_path):
+    first = _write(tmp_path, 'a.yxmd', 'Cust_SSN')
+    second = _write(tmp_path, 'b.yxmd', 'Cust_SSN', root='OTHER')
+    daemon = main.WorkflowWatchDaemon(str(tmp_path), 'SOT_MAIN')
+    changed, removed = daemon.poll_once()
+    assert sorted(changed) == sorted([first, second]) and removed == []
+    assert daemon.poll_once() == ([], [])
+    assert daemon.index.sot_impact('SOT_MAIN')['workflow_count'] == 1
+
+    _write(tmp_path, 'a.yxmd', 'Cust_TaxNumber')
+    _write(tmp_path, 'b.yxmd', 'Cust_SSN') # now reads the SoT, so the cached impact must be dropped
+    assert sorted(daemon.poll_once()[0]) == sorted([first, second])
+    assert daemon.index.field_usages('cust_ssn')['workflow_count'] == 1
+    assert daemon.index.sot_impact('SOT_MAIN')['workflow_count'] == 2
+    _assert_same_index(daemon.index, _fresh_index(tmp_path), ['CustID', 'Cust_SSN', 'Cust_TaxNumber'])
+
+    os.remove(second)
+    assert daemon.poll_once() == ([], [second])
+    assert daemon.index.field_usages('Cust_SSN')['usage_count'] == 0
+    assert daemon.index.workflow_fields('b.yxmd')['workflows'] == []
+    _assert_same_index(daemon.index, _fresh_index(tmp_path), ['CustID', 'Cust_SSN', 'Cust_TaxNumber'])
+
+
+def test_query_api_serves_the_index(tmp_path):
+    _write(tmp_path, 'a.yxmd', 'Cust_SSN')
+    daemon = main.WorkflowWatchDaemon(str(tmp_path), 'SOT_MAIN', poll_interval=60)
+    host, port = daemon.start('127.0.0.1', 0)
+    try:
+        def get(path):
+            with urlopen(f"http://{host}:{port}{path}", timeout=5) as response:
+                return json.loads(response.read())
+        assert get('/status')['workflows'] == 1
+        assert get('/fields/custid?sot_only=1')['usage_count'] == 3
+        assert get('/sot-impact?key=SOT_MAIN')['workflows'][0]['DownstreamFields'] == ['CustID', 'Cust_SSN']
+        assert sorted(get('/workflows/a.yxmd/fields')['workflows'][0]['Fields']) == ['CustID', 'Cust_SSN']
+    finally:
+        daemon.stop()
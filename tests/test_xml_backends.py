@@ -0,0 +1,59 @@
+import pytest
+
+import main
+
+WORKFLOW_XML = """<?xml version="1.0" encoding="utf-8"?>
+<!-- comments and processing instructions are dropped by both backends -->
+<AlteryxDocument yxmdVer="2020.1">
+  <Nodes>
+    <Node ToolID="1"><GuiSettings Plugin="CalgaryPluginsGui.CalgaryInput.CalgaryInput"/><Properties><Configuration>
+      <RootFileName>D:\\data\\SOT_MAIN.cydb</RootFileName>
+      <Query>&lt;Query&gt;&lt;Field name="CustID"/&gt;&lt;Field name="Région"/&gt;&lt;/Query&gt;</Query></Configuration></Properties></Node>
+    <Node ToolID="2"><GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"/><Properties><Configuration>
+      <?alteryx ignore?>
+      <FormulaFields><FormulaField field="Cust_SSN" expression="[SSN] + [CustID]"/></FormulaFields></Configuration></Properties></Node>
+    <Node ToolID="3"><GuiSettings Plugin="AlteryxBasePluginsGui.Filter.Filter"/><Properties><Configuration>
+      <Expression>[Région] = "Nord" AND [CustID] &gt; 0</Expression></Configuration></Properties></Node>
+  </Nodes>
+  <Connections>
+    <Connection><Origin ToolID="1"/><Destination ToolID="2"/></Connection>
+    <Connection><Origin ToolID="2"/><Destination ToolID="3"/></Connection>
+  </Connections>
+</AlteryxDocument>
+"""
+
+
+@pytest.fixture
+def workflow_dir(tmp_path):
+    (tmp_path / 'parity.yxmd').write_text(WORKFLOW_XML, encoding='utf-8')
+    return str(tmp_path)
+
+
+def test_lxml_and_stdlib_backends_extract_identical_usages(workflow_dir):
+    if main.lxml_etree is None: pytest.skip("lxml is not installed")
+    assert main.benchmark_xml_backends(workflow_dir, 'SOT_MAIN', repeat=1)['identical']
+    filepath = workflow_dir + '/parity.yxmd'
+    scans = {}
+    previous = main._active_xml_backend
+    try:
+        for backend in ('stdlib', 'lxml'):
+            main.set_xml_backend(backend)
+            scans[backend] = main.scan_workflow(filepath, 'SOT_MAIN')
+    finally:
+        main._active_xml_backend = previous
+    assert scans['lxml']['usages'] == scans['stdlib']['usages']
+    assert {u['FieldName'] for u in scans['lxml']['usages']} >= {'CustID', 'Région', 'Cust_SSN', 'SSN'}
+    assert scans['lxml']['tool_graph'].to_record() == scans['stdlib']['tool_graph'].to_record()
+
+
+def test_xml_backend_argument_does_not_change_the_default(workflow_dir, tmp_path):
+    previous = main._active_xml_backend
+    try:
+        main.set_xml_backend('stdlib')
+        main.analyze_alteryx_ecosystem_merged(workflow_dir, output_b_csv_filename=str(tmp_path / 'out.csv'),
+                                              sot_filename_key='SOT_MAIN', xml_backend='auto')
+        assert main.get_xml_backend() == 'stdlib'
+        main.benchmark_xml_backends(workflow_dir, repeat=1)
+        assert main.get_xml_backend() == 'stdlib'
+    finally:
+        main._active_xml_backend = previous